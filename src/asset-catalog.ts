@@ -0,0 +1,153 @@
+import { promises as fs } from 'fs';
+import { join } from 'path';
+
+// iRacing catalog endpoints and the id field each is keyed by
+const CATALOGS = {
+    cars: { path: '/data/car/get', idField: 'car_id' },
+    carAssets: { path: '/data/car/assets', idField: 'car_id' },
+    trackAssets: { path: '/data/track/assets', idField: 'track_id' }
+} as const;
+
+export type CatalogName = keyof typeof CATALOGS;
+
+export interface AssetCatalogOptions {
+    dir?: string;
+    refreshIntervalMs?: number;
+}
+
+interface LoadedCatalog {
+    byId: Map<number, any>;
+    fetchedAt: number;
+}
+
+// Index a catalog payload by id; payloads are either arrays or objects keyed by id
+export function indexCatalog(payload: any, idField: string): Map<number, any> {
+    const byId = new Map<number, any>();
+    if (Array.isArray(payload)) {
+        for (const entry of payload) {
+            const id = entry?.[idField] ?? entry?.id;
+            if (typeof id === 'number') byId.set(id, entry);
+        }
+    } else if (payload && typeof payload === 'object') {
+        for (const [key, entry] of Object.entries(payload)) {
+            const id = (entry as any)?.[idField] ?? (entry as any)?.id ?? Number(key);
+            if (typeof id === 'number' && Number.isFinite(id)) byId.set(id, entry);
+        }
+    }
+    return byId;
+}
+
+// Car and track catalogs change only with iRacing content releases, so they are loaded once into
+// id-keyed maps, persisted to disk and refreshed in the background. A stale copy keeps being
+// served while its refresh runs; concurrent loads share one request per catalog.
+export class AssetCatalog {
+    private readonly fetchCatalog: (path: string) => Promise<any>;
+    private readonly dir: string;
+    private readonly refreshIntervalMs: number;
+    private loaded = new Map<CatalogName, LoadedCatalog>();
+    private inFlight = new Map<CatalogName, Promise<LoadedCatalog>>();
+    private refreshTimer: NodeJS.Timeout | null = null;
+
+    constructor(fetchCatalog: (path: string) => Promise<any>, opts?: AssetCatalogOptions) {
+        this.fetchCatalog = fetchCatalog;
+        this.dir = opts?.dir ?? './data/cache/assets';
+        this.refreshIntervalMs = opts?.refreshIntervalMs ?? 24 * 60 * 60 * 1000;
+    }
+
+    async getCar(carId: number): Promise<any | null> {
+        return (await this.load('cars')).byId.get(carId) ?? null;
+    }
+
+    async getCarAsset(carId: number): Promise<any | null> {
+        return (await this.load('carAssets')).byId.get(carId) ?? null;
+    }
+
+    async getTrackAsset(trackId: number): Promise<any | null> {
+        return (await this.load('trackAssets')).byId.get(trackId) ?? null;
+    }
+
+    // Raw catalog as an id-keyed map
+    async getCatalog(name: CatalogName): Promise<Map<number, any>> {
+        return (await this.load(name)).byId;
+    }
+
+    // Re-download a catalog (or all of them), sharing any refresh already in progress
+    async refresh(name?: CatalogName): Promise<void> {
+        const names = name ? [name] : (Object.keys(CATALOGS) as CatalogName[]);
+        await Promise.all(names.map(n => this.fetch(n)));
+    }
+
+    startRefreshTimer(): void {
+        if (this.refreshTimer) return;
+        this.refreshTimer = setInterval(() => {
+            // Only refresh catalogs something has actually asked for
+            for (const name of this.loaded.keys()) {
+                this.fetch(name).catch(err => console.warn(`Asset catalog refresh failed for ${name}:`, err));
+            }
+        }, this.refreshIntervalMs);
+        this.refreshTimer.unref?.();
+    }
+
+    stopRefreshTimer(): void {
+        if (this.refreshTimer) {
+            clearInterval(this.refreshTimer);
+            this.refreshTimer = null;
+        }
+    }
+
+    private async load(name: CatalogName): Promise<LoadedCatalog> {
+        let catalog = this.loaded.get(name);
+        if (!catalog) catalog = (await this.readFromDisk(name)) ?? undefined;
+        if (!catalog) return this.fetch(name);
+        if (Date.now() - catalog.fetchedAt > this.refreshIntervalMs && !this.inFlight.has(name)) {
+            this.fetch(name).catch(err => console.warn(`Asset catalog refresh failed for ${name}:`, err));
+        }
+        return catalog;
+    }
+
+    private fetch(name: CatalogName): Promise<LoadedCatalog> {
+        let pending = this.inFlight.get(name);
+        if (!pending) {
+            pending = (async () => {
+                const { path, idField } = CATALOGS[name];
+                const byId = indexCatalog(await this.fetchCatalog(path), idField);
+                if (byId.size === 0) throw new Error(`Empty ${name} catalog from ${path}`);
+                const catalog: LoadedCatalog = { byId, fetchedAt: Date.now() };
+                this.loaded.set(name, catalog);
+                await this.writeToDisk(name, catalog);
+                return catalog;
+            })().finally(() => this.inFlight.delete(name));
+            this.inFlight.set(name, pending);
+        }
+        return pending;
+    }
+
+    private async readFromDisk(name: CatalogName): Promise<LoadedCatalog | null> {
+        try {
+            const raw = JSON.parse(await fs.readFile(this.pathFor(name), 'utf8'));
+            if (typeof raw?.fetchedAt !== 'number' || !Array.isArray(raw?.entries)) return null;
+            const catalog: LoadedCatalog = { byId: new Map(raw.entries), fetchedAt: raw.fetchedAt };
+            // A fetch may have completed while we were reading
+            if (!this.loaded.has(name)) this.loaded.set(name, catalog);
+            return this.loaded.get(name) ?? catalog;
+        } catch {
+            return null;
+        }
+    }
+
+    private async writeToDisk(name: CatalogName, catalog: LoadedCatalog): Promise<void> {
+        try {
+            await fs.mkdir(this.dir, { recursive: true });
+            const file = this.pathFor(name);
+            const tmp = `${file}.${process.pid}.tmp`;
+            await fs.writeFile(tmp, JSON.stringify({ fetchedAt: catalog.fetchedAt, entries: Array.from(catalog.byId.entries()) }));
+            await fs.rename(tmp, file);
+        } catch (error) {
+            console.warn(`Could not persist ${name} catalog:`, error);
+        }
+    }
+
+    private pathFor(name: CatalogName): string {
+        return join(this.dir, `${name}.json`);
+    }
+}
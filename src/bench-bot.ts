@@ -0,0 +1,417 @@
+import { existsSync, promises as fs, readFileSync } from 'fs';
+import { createServer, IncomingMessage, Server, ServerResponse } from 'http';
+import * as os from 'os';
+import * as path from 'path';
+import { performance } from 'perf_hooks';
+import { Collection, TextChannel } from 'discord.js';
+import { iRacingBot } from './bot';
+import { RaceResult } from './database';
+import { metrics } from './metrics';
+
+// End-to-end benchmark of the bot against a local stand-in for members-ng, S3 and Discord.
+// Drives the startup race log reconcile, a poll cycle and /history at synthetic scale.
+// Usage: npm run build && npm run bench:bot -- [--users 500] [--channels 50] [--guilds 10]
+//   [--results 1] [--new 1] [--history-users 10] [--latency 5] [--discord-latency 2]
+//   [--fixtures dir] [--ai] [--prometheus] [--verbose] [--keep]
+//
+// --fixtures replays recorded responses: a request for /data/results/get?subsession_id=1 is served
+// from <dir>/data/results/get/subsession_id=1.json, else <dir>/data/results/get.json, else a
+// synthetic payload. S3 chunk files are looked up the same way by their path.
+
+function argValue(name: string, fallback: string): string {
+  const idx = process.argv.indexOf(`--${name}`);
+  return idx >= 0 && process.argv[idx + 1] ? process.argv[idx + 1]! : fallback;
+}
+
+function argInt(name: string, fallback: number): number {
+  const value = parseInt(argValue(name, String(fallback)), 10);
+  return Number.isFinite(value) ? value : fallback;
+}
+
+const delay = (ms: number) => new Promise<void>(resolve => setTimeout(resolve, ms));
+
+// Latency with ±50% jitter so concurrent requests don't complete in lockstep
+const jittered = (ms: number) => (ms > 0 ? delay(ms * (0.5 + Math.random())) : Promise.resolve());
+
+interface World {
+  users: number;
+  resultsPerUser: number;
+  newPerUser: number;
+  showNewRaces: boolean;
+  cars: number;
+  tracks: number;
+  now: number;
+}
+
+const custId = (u: number) => 100_000 + u;
+const subsessionId = (u: number, k: number) => 60_000_000 + u * 100 + k;
+const carFor = (w: World, u: number, k: number) => 1 + ((u * 7 + k) % w.cars);
+const trackFor = (w: World, u: number, k: number) => 1 + ((u * 3 + k) % w.tracks);
+// Stored races are spread over the last 60 days; new ones happen just before the poll
+const raceTime = (w: World, u: number, k: number) => k < w.resultsPerUser
+  ? w.now - (60 - (60 * (k + 1)) / (w.resultsPerUser + 1)) * 86_400_000 - u * 1000
+  : w.now - (w.newPerUser + w.resultsPerUser - k) * 3_600_000;
+
+function recentRace(w: World, u: number, k: number): any {
+  return {
+    subsession_id: subsessionId(u, k),
+    session_start_time: new Date(raceTime(w, u, k)).toISOString(),
+    series_id: 1 + (k % 20),
+    series_name: `Series ${1 + (k % 20)}`,
+    track: { track_id: trackFor(w, u, k), track_name: `Track ${trackFor(w, u, k)}`, config_name: 'Grand Prix' },
+    car_id: carFor(w, u, k),
+    finish_position: (u + k) % 20,
+    start_position: 1 + ((u * 3 + k) % 20),
+    incidents: (u + k) % 9,
+    oldi_rating: 1500 + u,
+    newi_rating: 1510 + u,
+    old_sub_level: 350,
+    new_sub_level: 362,
+    laps: 20
+  };
+}
+
+function subsession(w: World, id: number): any {
+  const u = Math.floor((id - 60_000_000) / 100);
+  const k = (id - 60_000_000) % 100;
+  const field = Array.from({ length: 20 }, (_, i) => ({
+    cust_id: i === 0 ? custId(u) : 900_000 + i,
+    display_name: i === 0 ? `Driver ${u}` : `Rival ${i}`,
+    finish_position: (u + k + i) % 20,
+    starting_position: 1 + ((u * 3 + k + i) % 20),
+    best_lap_time: 900_000 + ((u * 31 + k * 17 + i * 7) % 50_000),
+    average_lap: 910_000 + ((u + i) % 40_000),
+    laps_complete: 20,
+    incidents: (u + i) % 9,
+    oldi_rating: 1500 + i * 10,
+    newi_rating: 1505 + i * 10
+  }));
+  return {
+    subsession_id: id,
+    start_time: new Date(raceTime(w, u, k)).toISOString(),
+    event_strength_of_field: 1800,
+    track: { track_id: trackFor(w, u, k), track_name: `Track ${trackFor(w, u, k)}` },
+    session_results: [
+      { simsession_number: -1, simsession_type_name: 'Qualifying', results: field },
+      { simsession_number: 0, simsession_type_name: 'Race', results: field }
+    ]
+  };
+}
+
+// Synthetic members-ng payloads; /data/* answers are handed out as S3 links like the real API
+function syntheticPayload(w: World, pathname: string, query: URLSearchParams, s3Base: string): any {
+  const num = (key: string) => parseInt(query.get(key) ?? '', 10);
+  switch (pathname) {
+    case '/data/stats/member_recent_races': {
+      const u = num('cust_id') - 100_000;
+      const count = w.resultsPerUser + (w.showNewRaces ? w.newPerUser : 0);
+      const races = Array.from({ length: count }, (_, k) => recentRace(w, u, k)).reverse().slice(0, 10);
+      return { cust_id: num('cust_id'), races };
+    }
+    case '/data/results/get':
+      return subsession(w, num('subsession_id'));
+    case '/data/results/lap_data':
+      return { success: true, chunk_info: { base_download_url: `${s3Base}/chunks/laps/${num('subsession_id')}/`, chunk_file_names: ['0.json', '1.json'] } };
+    case '/data/results/event_log':
+      return [{ type: 'pit', cust_id: custId(0) }, { type: 'caution' }];
+    case '/data/results/lap_chart_data':
+      return { success: true };
+    case '/data/stats/world_records':
+      return { type: 'stats_world_records', data: { success: true, chunk_info: { base_download_url: `${s3Base}/chunks/wr/${num('car_id')}/${num('track_id')}/`, chunk_file_names: ['0.json', '1.json', '2.json'] } } };
+    case '/data/car/get':
+      return Array.from({ length: w.cars }, (_, i) => ({ car_id: i + 1, car_name: `Car ${i + 1}` }));
+    case '/data/car/assets':
+      return Object.fromEntries(Array.from({ length: w.cars }, (_, i) => [String(i + 1), { car_id: i + 1, folder: `/img/cars/${i + 1}`, small_image: 'small.jpg' }]));
+    case '/data/track/assets':
+      return Object.fromEntries(Array.from({ length: w.tracks }, (_, i) => [String(i + 1), { track_id: i + 1, track_map: `${s3Base}/maps/${i + 1}/`, track_map_layers: { active: 'active.svg' } }]));
+    default:
+      return null;
+  }
+}
+
+function syntheticChunk(pathname: string): any[] | null {
+  const parts = pathname.split('/');
+  if (pathname.startsWith('/chunks/laps/')) {
+    const chunk = parseInt(parts[4] ?? '0', 10);
+    return Array.from({ length: 10 }, (_, i) => ({
+      lap_number: chunk * 10 + i + 1,
+      lap_time: 900_000 + ((chunk * 10 + i) * 137) % 20_000,
+      incident: i === 3,
+      lap_events: i === 3 ? ['off track'] : []
+    }));
+  }
+  if (pathname.startsWith('/chunks/wr/')) {
+    const chunk = parseInt(parts[5] ?? '0', 10);
+    return Array.from({ length: 2_000 }, (_, i) => ({
+      cust_id: chunk * 2_000 + i,
+      race_lap_time: 880_000 + chunk * 1_000 + i,
+      qualify_lap_time: 879_000 + i,
+      practice_lap_time: 878_000 + i,
+      tt_lap_time: -1
+    }));
+  }
+  return null;
+}
+
+function fixturePath(dir: string, pathname: string, query: URLSearchParams): string | null {
+  const clean = pathname.replace(/\.json$/, '').replace(/^\/+/, '');
+  const keys = Array.from(query.keys()).sort();
+  if (keys.length > 0) {
+    const name = keys.map(k => `${k}=${query.get(k)}`).join('&').replace(/[^\w=&.-]/g, '_');
+    const exact = path.join(dir, clean, `${name}.json`);
+    if (existsSync(exact)) return exact;
+  }
+  const generic = path.join(dir, `${clean}.json`);
+  return existsSync(generic) ? generic : null;
+}
+
+interface MockServers {
+  membersBase: string;
+  s3Base: string;
+  close: () => void;
+}
+
+async function startMockIracing(w: World, latencyMs: number, fixturesDir: string | null): Promise<MockServers> {
+  const servers: Server[] = [];
+  let s3Base = '';
+  const send = (res: ServerResponse, status: number, body: string, contentType: string = 'application/json') => {
+    res.writeHead(status, { 'Content-Type': contentType, 'Content-Length': Buffer.byteLength(body) });
+    res.end(body);
+  };
+  const handler = (isS3: boolean) => async (req: IncomingMessage, res: ServerResponse) => {
+    const url = new URL(req.url ?? '/', 'http://mock');
+    await jittered(latencyMs);
+    if (req.method === 'POST' && url.pathname === '/auth') {
+      res.setHeader('Set-Cookie', ['authtoken_members=bench; Path=/']);
+      return send(res, 200, JSON.stringify({ authcode: 'bench' }));
+    }
+    if (req.method === 'POST' && url.pathname === '/chat/completions') {
+      return send(res, 200, JSON.stringify({ choices: [{ message: { content: 'A tidy drive from the midfield, no drama, points banked.' } }] }));
+    }
+    const fixture = fixturesDir ? fixturePath(fixturesDir, isS3 ? url.pathname.replace(/^\/s3/, '') : url.pathname, url.searchParams) : null;
+    if (!isS3 && url.pathname.startsWith('/data/')) {
+      // Hand out an S3-style link; the payload is produced when the link is fetched
+      if (!fixture && syntheticPayload(w, url.pathname, url.searchParams, s3Base) === null) return send(res, 404, '{}');
+      return send(res, 200, JSON.stringify({ link: `${s3Base}/s3${url.pathname}${url.search}`, expires: new Date(Date.now() + 600_000).toISOString() }));
+    }
+    if (fixture) return send(res, 200, readFileSync(fixture, 'utf8'));
+    if (url.pathname.startsWith('/s3/data/')) {
+      const payload = syntheticPayload(w, url.pathname.slice(3), url.searchParams, s3Base);
+      return payload === null ? send(res, 404, '{}') : send(res, 200, JSON.stringify(payload));
+    }
+    if (url.pathname.startsWith('/chunks/')) {
+      const rows = syntheticChunk(url.pathname);
+      return rows === null ? send(res, 404, '[]') : send(res, 200, JSON.stringify(rows));
+    }
+    if (url.pathname.startsWith('/maps/')) {
+      return send(res, 200, '<svg xmlns="http://www.w3.org/2000/svg" width="400" height="300"><path d="M50 150 C 50 20, 350 20, 350 150 S 50 280, 50 150" stroke="#ffffff" stroke-width="8" fill="none"/></svg>', 'image/svg+xml');
+    }
+    return send(res, 404, '{}');
+  };
+  for (const isS3 of [false, true]) {
+    const server = createServer((req, res) => {
+      handler(isS3)(req, res).catch(() => send(res, 500, '{}'));
+    });
+    await new Promise<void>(resolve => server.listen(0, '127.0.0.1', resolve));
+    servers.push(server);
+  }
+  const port = (s: Server) => (s.address() as { port: number }).port;
+  s3Base = `http://127.0.0.1:${port(servers[1]!)}`;
+  return {
+    membersBase: `http://127.0.0.1:${port(servers[0]!)}`,
+    s3Base,
+    close: () => servers.forEach(s => {
+      s.closeAllConnections?.();
+      s.close();
+    })
+  };
+}
+
+// TextChannel stand-in with the parts of the API the race log code uses
+function mockChannel(id: string, botUserId: string, latencyMs: number, nextId: () => string): TextChannel {
+  const channel = Object.create(TextChannel.prototype) as TextChannel;
+  const messages = new Map<string, any>();
+  const createMessage = () => {
+    const message: any = {
+      id: nextId(),
+      pinned: false,
+      author: { id: botUserId },
+      createdTimestamp: Date.now(),
+      edit: async () => {
+        await jittered(latencyMs);
+        return message;
+      },
+      delete: async () => {
+        await jittered(latencyMs);
+        messages.delete(message.id);
+        return message;
+      }
+    };
+    messages.set(message.id, message);
+    return message;
+  };
+  Object.defineProperty(channel, 'id', { value: id });
+  Object.defineProperty(channel, 'messages', {
+    value: {
+      fetch: async ({ limit, before }: { limit: number; before?: string }) => {
+        await jittered(latencyMs);
+        const page = Array.from(messages.values())
+          .filter(m => !before || BigInt(m.id) < BigInt(before))
+          .sort((a, b) => (BigInt(b.id) > BigInt(a.id) ? 1 : -1))
+          .slice(0, limit);
+        return new Collection(page.map(m => [m.id, m]));
+      }
+    }
+  });
+  (channel as any).send = async () => {
+    await jittered(latencyMs);
+    return createMessage();
+  };
+  (channel as any).bulkDelete = async (batch: any[]) => {
+    await jittered(latencyMs);
+    for (const m of batch) messages.delete(m.id);
+  };
+  return channel;
+}
+
+async function phase(label: string, fn: () => Promise<void>): Promise<void> {
+  metrics.reset();
+  const start = performance.now();
+  await fn();
+  const ms = performance.now() - start;
+  const api = metrics.summary('iracing_request_duration_seconds');
+  const sends = metrics.summary('discord_send_duration_seconds');
+  const hits = metrics.counterValue('cache_lookups_total', { result: 'hit' });
+  const lookups = metrics.counterValue('cache_lookups_total');
+  console.log(
+    `${label.padEnd(22)} ${(ms / 1000).toFixed(2).padStart(8)} s  ` +
+    `api ${String(api.count).padStart(6)} req (mean ${(api.mean * 1000).toFixed(1)} ms)  ` +
+    `discord ${String(sends.count).padStart(6)} msg (mean ${(sends.mean * 1000).toFixed(1)} ms)  ` +
+    `cache hit ${lookups > 0 ? ((100 * hits) / lookups).toFixed(0) : '-'}%`
+  );
+  if (process.argv.includes('--prometheus')) console.log(metrics.render());
+}
+
+async function benchBot(): Promise<void> {
+  const users = argInt('users', 500);
+  const channels = argInt('channels', 50);
+  const guilds = Math.max(1, Math.min(channels, argInt('guilds', 10)));
+  const historyUsers = Math.min(users, argInt('history-users', 10));
+  const world: World = {
+    users,
+    resultsPerUser: Math.max(1, Math.min(90, argInt('results', 1))),
+    newPerUser: Math.max(0, Math.min(9, argInt('new', 1))),
+    showNewRaces: false,
+    cars: 40,
+    tracks: 30,
+    now: Date.now()
+  };
+  const fixtures = process.argv.includes('--fixtures') ? path.resolve(argValue('fixtures', '.')) : null;
+
+  // Everything the bot writes (database, caches) goes to a scratch directory
+  const workDir = await fs.mkdtemp(path.join(os.tmpdir(), 'iracing-bench-bot-'));
+  process.chdir(workDir);
+  const mock = await startMockIracing(world, argInt('latency', 5), fixtures);
+  process.env.IRACING_BASE_URL = mock.membersBase;
+  process.env.IRACING_USERNAME = 'bench@example.com';
+  process.env.IRACING_PASSWORD = 'bench';
+  delete process.env.IRACING_HASHWORD;
+  if (process.argv.includes('--ai')) {
+    process.env.OPENROUTER_BASE = mock.s3Base;
+    process.env.OPENROUTER_MODEL = 'bench/model';
+    process.env.OPENROUTER_KEY = 'bench';
+  } else {
+    delete process.env.OPENROUTER_MODEL;
+    delete process.env.OPENROUTER_KEY;
+  }
+
+  const bot = new iRacingBot();
+  // The benchmark reaches into the bot the same way its Discord event handlers would
+  const internals = bot as any;
+  await internals.client.destroy();
+  let messageSeq = 1_000_000_000_000_000_000n;
+  const nextId = () => String(++messageSeq);
+  const botUserId = 'bench-bot';
+  const channelMap = new Map<string, TextChannel>();
+  internals.client = { user: { id: botUserId, tag: 'bench#0000' }, channels: { fetch: async (id: string) => channelMap.get(id) ?? null } };
+
+  const db = internals.db;
+  await db.initDb();
+  const seedStart = performance.now();
+  for (let c = 0; c < channels; c++) {
+    const channelId = `chan-${c}`;
+    channelMap.set(channelId, mockChannel(channelId, botUserId, argInt('discord-latency', 2), nextId));
+    await db.setRaceLogChannel(channelId, `guild-${c % guilds}`);
+  }
+  for (let g = 0; g < guilds; g += 3) await db.addGuildPrompt(`guild-${g}`, `Guild ${g} house style`);
+  const seeded: RaceResult[] = [];
+  for (let u = 0; u < users; u++) {
+    await db.linkUser(`user-${u}`, `Driver ${u}`, custId(u));
+    for (let k = 0; k < world.resultsPerUser; k++) {
+      const race = recentRace(world, u, k);
+      seeded.push({
+        subsession_id: race.subsession_id,
+        discord_id: `user-${u}`,
+        iracing_customer_id: custId(u),
+        iracing_username: `Driver ${u}`,
+        series_id: race.series_id,
+        series_name: race.series_name,
+        track_id: race.track.track_id,
+        track_name: race.track.track_name,
+        config_name: race.track.config_name,
+        car_id: race.car_id,
+        car_name: `Car ${race.car_id}`,
+        start_time: race.session_start_time,
+        finish_position: race.finish_position + 1,
+        starting_position: race.start_position,
+        incidents: race.incidents,
+        irating_before: race.oldi_rating,
+        irating_after: race.newi_rating,
+        event_type: 'Race',
+        official_session: true,
+        created_at: race.session_start_time,
+        last_updated: race.session_start_time
+      });
+    }
+  }
+  await db.upsertRaceResults(seeded);
+  console.log(`Seeded ${users} users, ${seeded.length} results, ${channels} channels in ${guilds} guilds in ${((performance.now() - seedStart) / 1000).toFixed(1)}s`);
+
+  const quiet = console.log;
+  const verbose = process.argv.includes('--verbose');
+  const run = async (fn: () => Promise<void>) => {
+    if (!verbose) console.log = () => {};
+    try {
+      await fn();
+    } finally {
+      console.log = quiet;
+    }
+  };
+
+  await phase('reconcile (cold)', () => run(() => internals.rebuildRaceLogsOnStartup()));
+  await phase('reconcile (warm)', () => run(() => internals.rebuildRaceLogsOnStartup()));
+  world.showNewRaces = true;
+  await phase(`poll (${world.newPerUser} new/user)`, () => run(() => internals.checkForNewRaceResults()));
+  await phase('poll (idle)', () => run(() => internals.checkForNewRaceResults()));
+  const ranges = ['90d', '30d', '6m', '1y', 'all'];
+  const history = async () => {
+    for (let u = 0; u < historyUsers; u++) {
+      for (const range of ranges) await internals.buildHistoryResponse(`user-${u}`, range);
+    }
+  };
+  await phase(`/history × ${historyUsers * ranges.length} (cold)`, () => run(history));
+  await phase(`/history × ${historyUsers * ranges.length} (warm)`, () => run(history));
+
+  internals.iracing.stopAssetRefresh();
+  db.close();
+  mock.close();
+  if (!process.argv.includes('--keep')) await fs.rm(workDir, { recursive: true, force: true });
+  else console.log(`Kept bench data in ${workDir}`);
+}
+
+if (require.main === module) {
+  benchBot().catch(err => {
+    console.error('Benchmark failed:', err);
+    process.exit(1);
+  });
+}
@@ -0,0 +1,108 @@
+import { promises as fs } from 'fs';
+import * as os from 'os';
+import * as path from 'path';
+import { performance } from 'perf_hooks';
+import { Database, RaceResult } from './database';
+
+// Benchmarks the race_results hot paths against a synthetic database.
+// Usage: npm run bench:db -- [--rows 1000000] [--users 500] [--db path/to/bench.db]
+
+function argValue(name: string, fallback: string): string {
+  const idx = process.argv.indexOf(`--${name}`);
+  return idx >= 0 && process.argv[idx + 1] ? process.argv[idx + 1]! : fallback;
+}
+
+async function time<T>(label: string, iterations: number, fn: () => Promise<T>): Promise<T> {
+  let result: T | undefined;
+  const start = performance.now();
+  for (let i = 0; i < iterations; i++) result = await fn();
+  const total = performance.now() - start;
+  console.log(`${label.padEnd(48)} ${(total / iterations).toFixed(3).padStart(10)} ms/op  (${iterations} ops)`);
+  return result as T;
+}
+
+function syntheticResult(i: number, users: number, base: number): RaceResult {
+  const user = i % users;
+  const start = new Date(base + i * 60 * 1000).toISOString();
+  return {
+    subsession_id: 50_000_000 + i,
+    discord_id: `user-${user}`,
+    iracing_customer_id: 100_000 + user,
+    iracing_username: `Driver ${user}`,
+    series_id: i % 120,
+    series_name: `Series ${i % 120}`,
+    track_id: i % 300,
+    track_name: `Track ${i % 300}`,
+    config_name: '',
+    car_id: i % 150,
+    car_name: `Car ${i % 150}`,
+    start_time: start,
+    finish_position: (i % 20) + 1,
+    starting_position: ((i * 7) % 20) + 1,
+    incidents: i % 9,
+    irating_before: 1500 + (i % 500),
+    irating_after: 1510 + (i % 500),
+    event_type: 'Race',
+    official_session: true,
+    created_at: start,
+    last_updated: start
+  };
+}
+
+async function benchDatabase(): Promise<void> {
+  const rows = parseInt(argValue('rows', '1000000'), 10);
+  const users = parseInt(argValue('users', '500'), 10);
+  const dbPath = path.resolve(argValue('db', path.join(os.tmpdir(), `iracing-bench-${process.pid}.db`)));
+  await fs.rm(dbPath, { force: true });
+
+  const db = new Database(dbPath);
+  await db.initDb();
+
+  const base = Date.UTC(2020, 0, 1);
+  const batch = 10_000;
+  const insertStart = performance.now();
+  for (let i = 0; i < rows; i += batch) {
+    const chunk: RaceResult[] = [];
+    for (let j = i; j < Math.min(rows, i + batch); j++) chunk.push(syntheticResult(j, users, base));
+    await db.upsertRaceResults(chunk);
+  }
+  const insertMs = performance.now() - insertStart;
+  console.log(`Inserted ${rows} results for ${users} users in ${(insertMs / 1000).toFixed(1)}s (${Math.round(rows / (insertMs / 1000))} rows/s)`);
+
+  const heavyUser = 'user-0';
+  // A poll sees ~10 recent races per user; half new, half already stored
+  const recentIds = Array.from({ length: 10 }, (_, k) => 50_000_000 + (rows - users * 5) + k * users);
+  const probeIds = recentIds.concat(recentIds.map(id => id + rows));
+
+  await time('getRaceResultExists × 20 (per-race N+1)', 50, async () => {
+    for (const id of probeIds) await db.getRaceResultExists(id, heavyUser);
+  });
+  await time('getExistingSubsessionIds (20 ids, one query)', 50, () => db.getExistingSubsessionIds(heavyUser, probeIds));
+  await time('getLatestRaceResultTime', 200, () => db.getLatestRaceResultTime(heavyUser));
+  await time('getRecentRaceResults (limit 32)', 200, () => db.getRecentRaceResults(heavyUser, 32));
+  const history = await time('getRaceResultsForUserAsc (all rows for user)', 10, () => db.getRaceResultsForUserAsc(heavyUser));
+  console.log(`  -> ${history.length} rows per user`);
+  // Ids of 0 are treated as "no filter", so pick a combo the heavy user actually drove with non-zero ids
+  const combo = history.find(r => r.track_id > 0 && r.car_id > 0);
+  if (combo) {
+    const filtered = await time('getRaceResultsForUserAsc (track + car filter)', 50, () => db.getRaceResultsForUserAsc(heavyUser, { trackId: combo.track_id, carId: combo.car_id }));
+    console.log(`  -> ${filtered.length} rows for track ${combo.track_id} / car ${combo.car_id}`);
+  }
+  await time('upsertRaceResults (100 rows, one transaction)', 10, () => db.upsertRaceResults(
+    Array.from({ length: 100 }, (_, k) => syntheticResult(rows + k, users, base))
+  ));
+
+  db.close();
+  if (!process.argv.includes('--keep')) {
+    await fs.rm(dbPath, { force: true });
+    await fs.rm(`${dbPath}-wal`, { force: true });
+    await fs.rm(`${dbPath}-shm`, { force: true });
+  }
+}
+
+if (require.main === module) {
+  benchDatabase().catch(err => {
+    console.error('Benchmark failed:', err);
+    process.exit(1);
+  });
+}
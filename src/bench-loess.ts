@@ -0,0 +1,46 @@
+import { performance } from 'perf_hooks';
+import { loessSmooth } from './loess';
+
+// Microbenchmark of the /history trend smoother.
+// Usage: npm run bench:loess -- [--points 10000] [--iterations 20]
+
+function argValue(name: string, fallback: string): string {
+  const idx = process.argv.indexOf(`--${name}`);
+  return idx >= 0 && process.argv[idx + 1] ? process.argv[idx + 1]! : fallback;
+}
+
+// Pace-like series: slow improvement, noise and the odd outlier, one point per race
+function syntheticPoints(count: number): Array<{ t: number; y: number }> {
+  const start = Date.UTC(2020, 0, 1);
+  const points: Array<{ t: number; y: number }> = [];
+  let seed = 42;
+  const rand = () => {
+    seed = (seed * 1103515245 + 12345) % 2147483648;
+    return seed / 2147483648;
+  };
+  for (let i = 0; i < count; i++) {
+    const trend = 8 - 5 * (i / count);
+    const outlier = rand() < 0.02 ? 20 * rand() : 0;
+    points.push({ t: start + i * 3 * 60 * 60 * 1000, y: trend + (rand() - 0.5) * 3 + outlier });
+  }
+  return points;
+}
+
+function benchLoess(): void {
+  const target = parseInt(argValue('points', '10000'), 10);
+  const iterations = parseInt(argValue('iterations', '20'), 10);
+  const sizes = Array.from(new Set([Math.max(10, Math.round(target / 10)), target, target * 4]));
+  for (const size of sizes) {
+    const points = syntheticPoints(size);
+    const resolution = Math.min(300, Math.max(120, points.length * 8));
+    loessSmooth(points, { resolution, robust: true }); // warm up
+    const start = performance.now();
+    for (let i = 0; i < iterations; i++) loessSmooth(points, { resolution, robust: true });
+    const ms = (performance.now() - start) / iterations;
+    console.log(`loessSmooth ${String(size).padStart(8)} points  ${ms.toFixed(2).padStart(10)} ms/op  ${((ms * 1e6) / size).toFixed(1).padStart(8)} ns/point`);
+  }
+}
+
+if (require.main === module) {
+  benchLoess();
+}
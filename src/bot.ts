@@ -1,18 +1,55 @@
 import { Client, GatewayIntentBits, SlashCommandBuilder, ChatInputCommandInteraction, MessageFlags, PermissionFlagsBits, TextChannel, EmbedBuilder, AttachmentBuilder, Message, Collection, ButtonBuilder, ButtonStyle, ActionRowBuilder, ButtonInteraction } from 'discord.js';
 import axios from 'axios';
 import sharp from 'sharp';
+import { createHash } from 'crypto';
+import { promises as fs } from 'fs';
 import { config } from 'dotenv';
-import { Database, OfficialSeries, RaceResult, RaceLogChannel } from './database';
+import { Database, OfficialSeries, RaceResult, RaceLogChannel, UserLink, RacePace, PaceDeferral } from './database';
 import { iRacingClient, Series } from './iracing-client';
+import { RacePoller, PollOutcome } from './race-poller';
+import { mapWithConcurrency } from './concurrency';
+import { loessSmooth } from './loess';
+import { metrics, startMetricsServer } from './metrics';
+import type { Server } from 'http';
 
 config();
 
-class iRacingBot {
+// Version of the race result embed layout; bump it to re-render every posted result on next startup
+const RACE_EMBED_VERSION = 2;
+// Unresolvable pace lookups are retried after 1h, 4h, 16h and 64h, then given up on
+const PACE_MAX_ATTEMPTS = 5;
+const PACE_RETRY_BASE_MS = 60 * 60 * 1000;
+// Track map PNGs kept in memory (a few hundred KB each)
+const TRACK_MAP_CACHE_SIZE = 32;
+
+// Guild-independent inputs of a race result message, computed once per result
+interface RaceRender {
+    context: any;
+    trackMapPng: Buffer | null;
+    carImageUrl: string | null;
+}
+
+interface RaceLogTarget {
+    channel: TextChannel;
+    logChannel: RaceLogChannel;
+    prompts: string[];
+}
+
+export class iRacingBot {
     private client: Client;
     private db: Database;
     private iracing: iRacingClient;
     private seriesUpdateInterval: NodeJS.Timeout | null = null;
     private raceResultUpdateInterval: NodeJS.Timeout | null = null;
+    private racePoller: RacePoller<UserLink>;
+    private summaryInFlight = new Map<string, Promise<string | null>>();
+    private sendConcurrency: number;
+    // LRU of track map PNG bytes keyed by local path; each message carries its own copy as an attachment
+    private trackMapPngs = new Map<string, Promise<Buffer | null>>();
+    // Per-user counter bumped whenever stored pace changes; part of the /history image cache key
+    private paceVersions = new Map<string, number>();
+    private historyImageCache = new Map<string, { imageBuffer: Buffer; points: number; combos: number }>();
+    private metricsServer: Server | null = null;
 
     constructor() {
         this.client = new Client({
@@ -21,6 +58,18 @@ class iRacingBot {
 
         this.db = new Database();
         this.iracing = new iRacingClient();
+        this.iracing.setWorldRecordStore(this.db);
+        this.racePoller = new RacePoller<UserLink>({
+            listUsers: async () => (await this.db.getAllLinkedUsers()).filter(u => !!u.iracing_customer_id),
+            userKey: (user) => user.discord_id,
+            pollUser: (user) => this.updateRaceResultsForUser(user),
+            initialActivity: async (user) => {
+                const latest = await this.db.getLatestRaceResultTime(user.discord_id);
+                return latest ? new Date(latest).getTime() : null;
+            },
+            concurrency: parseInt(process.env.RACE_POLL_CONCURRENCY || '', 10) || 4
+        });
+        this.sendConcurrency = parseInt(process.env.RACE_LOG_SEND_CONCURRENCY || '', 10) || 5;
         this.setupEventHandlers();
     }
 
@@ -31,6 +80,7 @@ class iRacingBot {
             await this.registerSlashCommands();
             await this.updateOfficialSeries();
             this.startSeriesUpdateTimer();
+            this.iracing.startAssetRefresh();
             await this.rebuildRaceLogsOnStartup();
             this.startRaceResultUpdateTimer();
         });
@@ -334,7 +384,8 @@ class iRacingBot {
     }
 
     private startRaceResultUpdateTimer(): void {
-        // Check for new race results every 10 minutes
+        // Run a poll cycle every 10 minutes; the poller decides which users are due
+        // and skips the tick entirely if the previous cycle is still running
         this.raceResultUpdateInterval = setInterval(async () => {
             await this.checkForNewRaceResults();
         }, 10 * 60 * 1000);
@@ -349,37 +400,44 @@ class iRacingBot {
         console.log('Checking for new race results...');
         
         try {
-            const linkedUsers = await this.db.getAllLinkedUsers();
-            
-            for (const user of linkedUsers) {
-                if (user.iracing_customer_id) {
-                    await this.updateRaceResultsForUser(user);
-                }
+            const stats = await this.racePoller.runCycle();
+            if (stats) {
+                metrics.observe('poll_cycle_duration_seconds', stats.durationMs / 1000);
+                metrics.inc('poll_users_total', undefined, stats.usersPolled);
+                metrics.inc('poll_new_results_total', undefined, stats.newResults);
+                metrics.inc('poll_errors_total', undefined, stats.errors);
+                const rl = this.iracing.getRateLimitState();
+                const budget = rl.remaining !== null ? ` • rate limit ${rl.remaining}/${rl.limit ?? '?'}` : '';
+                console.log(`Race result check completed: polled ${stats.usersPolled}/${stats.usersTotal} users, ${stats.newResults} new result(s), ${stats.errors} error(s) in ${(stats.durationMs / 1000).toFixed(1)}s${budget}`);
             }
-            
-            console.log('Race result check completed');
         } catch (error) {
             console.error('Error during race result check:', error);
         }
     }
 
-    private async updateRaceResultsForUser(user: any): Promise<void> {
-        try {
-            // Use member_recent_races which already filters to actual races
-            const recentRaces = await this.iracing.getMemberRecentRaces(user.iracing_customer_id);
-
-            if (recentRaces && recentRaces.length > 0) {
-                for (const race of recentRaces) {
-                    // Check if we already have this result
-                    const exists = await this.db.getRaceResultExists(race.subsession_id, user.discord_id);
-                    if (!exists) {
-                        await this.processNewRaceResult(race, user);
-                    }
+    private async updateRaceResultsForUser(user: any): Promise<PollOutcome> {
+        let newResults = 0;
+        let latestActivity: number | null = null;
+        // Use member_recent_races which already filters to actual races.
+        // Errors propagate to the poller, which logs and counts them per cycle.
+        const recentRaces: any[] | null = await this.iracing.getMemberRecentRaces(user.iracing_customer_id);
+        if (recentRaces === null) {
+            throw new Error(`Could not fetch recent races for customer ${user.iracing_customer_id}`);
+        }
+
+        if (recentRaces.length > 0) {
+            // One set-based lookup instead of a query per race
+            const existing = await this.db.getExistingSubsessionIds(user.discord_id, recentRaces.map(r => r.subsession_id));
+            for (const race of recentRaces) {
+                const t = new Date(race.session_start_time || race.start_time).getTime();
+                if (Number.isFinite(t) && (latestActivity === null || t > latestActivity)) latestActivity = t;
+                if (!existing.has(race.subsession_id)) {
+                    await this.processNewRaceResult(race, user);
+                    newResults++;
                 }
             }
-        } catch (error) {
-            console.error(`Error updating race results for user ${user.iracing_username}:`, error);
         }
+        return { newResults, latestActivity };
     }
 
     private async processNewRaceResult(raceData: any, user: any): Promise<void> {
@@ -447,13 +505,23 @@ class iRacingBot {
 
             // Save to database
             await this.db.upsertRaceResult(raceResult);
+            this.bumpPaceVersion(raceResult.discord_id);
             
             // Post to race log channels with enhanced data
             await this.postRaceResultToChannels(raceResult, raceData);
+
+            // Materialize best lap and % over WR for /history (WR and subsession are cached by now)
+            try {
+                await this.updateRacePace([raceResult]);
+            } catch (error) {
+                console.warn(`Could not store pace for subsession ${raceResult.subsession_id}:`, error);
+            }
             
             console.log(`Processed new race result for ${user.iracing_username}: ${raceResult.series_name} - P${raceResult.finish_position}`);
         } catch (error) {
-            console.error(`Error processing race result for ${user.iracing_username}:`, error);
+            // Rethrown so the poller counts the failure and later results wait for the next cycle
+            console.error(`Error processing race result ${raceData.subsession_id} for ${user.iracing_username}:`, error);
+            throw error;
         }
     }
 
@@ -467,89 +535,212 @@ class iRacingBot {
         return eventTypes[eventType] || 'Unknown';
     }
 
+    // Renders a result once and posts it to every race log channel in parallel
     private async postRaceResultToChannels(raceResult: RaceResult, raceData: any): Promise<void> {
         try {
             const raceLogChannels = await this.db.getAllRaceLogChannels();
-            
-            for (const logChannel of raceLogChannels) {
-                const channel = await this.client.channels.fetch(logChannel.channel_id);
-                if (channel && channel instanceof TextChannel) {
-                    const { embed, attachment } = await this.createRaceResultEmbed(raceResult, raceData, logChannel.guild_id);
-                    const messageOptions: any = { embeds: [embed], allowedMentions: { parse: [], users: [], roles: [], repliedUser: false } };
-                    if (attachment) {
-                        messageOptions.files = [attachment];
+            if (raceLogChannels.length === 0) return;
+
+            const promptsByGuild = new Map<string, Promise<string[]>>();
+            const resolved = await mapWithConcurrency(raceLogChannels, this.sendConcurrency, async (logChannel): Promise<RaceLogTarget | null> => {
+                try {
+                    const channel = await this.client.channels.fetch(logChannel.channel_id);
+                    if (!channel || !(channel instanceof TextChannel)) return null;
+                    let prompts = promptsByGuild.get(logChannel.guild_id);
+                    if (!prompts) {
+                        prompts = this.db.getGuildPrompts(logChannel.guild_id);
+                        promptsByGuild.set(logChannel.guild_id, prompts);
                     }
-                    await channel.send(messageOptions);
+                    return { channel, logChannel, prompts: await prompts };
+                } catch (error) {
+                    console.error(`Could not resolve race log channel ${logChannel.channel_id}:`, error);
+                    return null;
                 }
-            }
+            });
+            const targets = resolved.filter((t): t is RaceLogTarget => t !== null);
+            if (targets.length === 0) return;
+
+            const render = await this.buildRaceRender(raceResult, raceData);
+            await this.fanOutRaceResult(raceResult, render, targets.map(target => ({ target })));
         } catch (error) {
             console.error('Error posting race result to channels:', error);
         }
     }
 
-    private async clearRaceLogChannel(channel: TextChannel): Promise<void> {
+    // Sends one rendered result to several channels with bounded concurrency. Channels that share a
+    // prompt set share one AI summary (see getRaceSummary). Failures are logged per channel.
+    private async fanOutRaceResult(result: RaceResult, render: RaceRender, jobs: Array<{ target: RaceLogTarget; existing?: Message }>): Promise<{ posted: number; edited: number }> {
+        let posted = 0;
+        let edited = 0;
+        const send = async ({ target, existing }: { target: RaceLogTarget; existing?: Message }) => {
+            try {
+                await this.sendRaceResult(target, result, render, existing);
+                if (existing) edited++;
+                else posted++;
+            } catch (err) {
+                console.error(`Failed to send result ${result.subsession_id} to channel ${target.channel.id}:`, err);
+            }
+        };
+        await mapWithConcurrency(jobs, this.sendConcurrency, send);
+        return { posted, edited };
+    }
+
+    // Hash of every input that shapes a race result message for a guild. A ledger entry whose
+    // hash no longer matches is re-rendered on startup.
+    private raceResultRenderHash(result: RaceResult, guildPrompts: string[]): string {
+        const payload = JSON.stringify([
+            RACE_EMBED_VERSION,
+            result.subsession_id, result.discord_id, result.iracing_username,
+            result.series_name, result.track_id, result.track_name, result.config_name,
+            result.car_id, result.car_name, result.start_time,
+            result.finish_position, result.starting_position ?? null, result.incidents,
+            result.irating_before ?? null, result.irating_after ?? null,
+            guildPrompts
+        ]);
+        return createHash('sha256').update(payload).digest('hex').slice(0, 32);
+    }
+
+    // Posts (or, given an existing message, edits) a race result and records it in the ledger
+    private async sendRaceResult(target: RaceLogTarget, result: RaceResult, render: RaceRender, existing?: Message): Promise<void> {
+        const { channel, prompts } = target;
+        const summary = await this.getRaceSummary(result, render, prompts);
+        const { embed, attachment } = this.createRaceResultEmbed(result, render, summary);
+        const messageOptions: any = { embeds: [embed], allowedMentions: { parse: [], users: [], roles: [], repliedUser: false } };
+        if (attachment) {
+            messageOptions.files = [attachment];
+        }
+        const message = await metrics.time('discord_send_duration_seconds', { op: existing ? 'edit' : 'send' }, () => existing
+            ? existing.edit({ ...messageOptions, attachments: [] }) // drop the previous attachment before re-uploading
+            : channel.send(messageOptions));
+        await this.db.upsertRaceLogMessage({
+            subsession_id: result.subsession_id,
+            discord_id: result.discord_id,
+            channel_id: channel.id,
+            message_id: message.id,
+            render_hash: this.raceResultRenderHash(result, prompts)
+        });
+    }
+
+    // Reads a rendered track map through a small LRU (Map order, hits move to the end). Failed or
+    // empty reads are not cached, so the next result tries again.
+    private loadTrackMapPng(trackMapPath: string): Promise<Buffer | null> {
+        const cached = this.trackMapPngs.get(trackMapPath);
+        if (cached) {
+            this.trackMapPngs.delete(trackMapPath);
+            this.trackMapPngs.set(trackMapPath, cached);
+            return cached;
+        }
+        const pending: Promise<Buffer | null> = fs.readFile(trackMapPath).then(
+            (png) => png.length > 0 ? png : null,
+            (error) => {
+                console.warn(`Could not read track map ${trackMapPath}:`, error);
+                return null;
+            }
+        ).then((png) => {
+            if (!png && this.trackMapPngs.get(trackMapPath) === pending) this.trackMapPngs.delete(trackMapPath);
+            return png;
+        });
+        this.trackMapPngs.set(trackMapPath, pending);
+        while (this.trackMapPngs.size > TRACK_MAP_CACHE_SIZE) {
+            const oldest = this.trackMapPngs.keys().next().value;
+            if (oldest === undefined) break;
+            this.trackMapPngs.delete(oldest);
+        }
+        return pending;
+    }
+
+    // raceData for a stored result, enriched with subsession details for laps and SoF
+    private storedRaceData(result: RaceResult, subsession: any): any {
+        const raceData: any = { car_id: result.car_id, start_position: result.starting_position };
         try {
-            console.log(`Clearing channel ${channel.id} (${channel.name})...`);
-            let lastId: string | undefined = undefined;
-            const fourteenDaysMs = 14 * 24 * 60 * 60 * 1000;
-            while (true) {
-                const batch: Collection<string, Message<boolean>> = await channel.messages.fetch({ limit: 100, before: lastId });
-                if (batch.size === 0) break;
-                const now = Date.now();
-                const nonPinned = batch.filter((m: Message) => !m.pinned);
-                const younger = nonPinned.filter((m: Message) => now - m.createdTimestamp < fourteenDaysMs);
-                const older = nonPinned.filter((m: Message) => now - m.createdTimestamp >= fourteenDaysMs);
-                if (younger.size > 0) {
-                    try {
-                        await channel.bulkDelete(younger, true);
-                    } catch (e) {
-                        // Fallback: delete younger individually if bulkDelete fails
-                        for (const msg of younger.values()) {
-                            try { await msg.delete(); } catch {}
-                        }
-                    }
+            if (subsession) {
+                raceData.event_laps_complete = subsession.event_laps_complete;
+                raceData.event_strength_of_field = subsession.event_strength_of_field;
+                // Fallback to user's laps_complete if available
+                const getType = (sr: any) => (sr?.simsession_type_name || sr?.simsession_name || sr?.session_type || '').toString();
+                const raceSession = Array.isArray(subsession.session_results) ? subsession.session_results.find((sr: any) => /race/i.test(getType(sr)) && !/qual/i.test(getType(sr))) : null;
+                const userRow = raceSession?.results?.find((r: any) => r.cust_id === result.iracing_customer_id);
+                if (userRow && typeof userRow.laps_complete === 'number') {
+                    raceData.laps = userRow.laps_complete;
                 }
-                for (const msg of older.values()) {
+            }
+        } catch {}
+        return raceData;
+    }
+
+    // Messages this bot has authored in a channel, keyed by message ID. Paging (newest first) stops once it
+    // reaches oldestId, the oldest message the ledger knows; without one the whole history is read.
+    private async fetchOwnMessages(channel: TextChannel, oldestId?: string): Promise<Map<string, Message>> {
+        const own = new Map<string, Message>();
+        const selfId = this.client.user?.id;
+        const stopAt = oldestId !== undefined ? BigInt(oldestId) : null;
+        let lastId: string | undefined = undefined;
+        while (true) {
+            const batch: Collection<string, Message<boolean>> = await channel.messages.fetch({ limit: 100, before: lastId });
+            if (batch.size === 0) break;
+            for (const m of batch.values()) {
+                if (m.author?.id === selfId) own.set(m.id, m);
+            }
+            lastId = batch.last()?.id;
+            if (!lastId || batch.size < 100) break;
+            if (stopAt !== null && BigInt(lastId) <= stopAt) break;
+        }
+        return own;
+    }
+
+    private async deleteMessages(channel: TextChannel, messages: Message[]): Promise<void> {
+        const fourteenDaysMs = 14 * 24 * 60 * 60 * 1000;
+        const now = Date.now();
+        const younger = messages.filter(m => now - m.createdTimestamp < fourteenDaysMs);
+        const older = messages.filter(m => now - m.createdTimestamp >= fourteenDaysMs);
+        for (let i = 0; i < younger.length; i += 100) {
+            const batch = younger.slice(i, i + 100);
+            try {
+                await channel.bulkDelete(batch, true);
+            } catch (e) {
+                // Fallback: delete younger individually if bulkDelete fails
+                for (const msg of batch) {
                     try { await msg.delete(); } catch {}
                 }
-                lastId = batch.last()?.id;
-                if (!lastId || batch.size < 100) break;
             }
-            console.log(`Channel ${channel.id} cleared.`);
-        } catch (err) {
-            console.error(`Failed to clear channel ${channel.id}:`, err);
+        }
+        for (const msg of older) {
+            try { await msg.delete(); } catch {}
         }
     }
 
-    private async repostAllFromDatabaseOldestFirst(): Promise<void> {
-        try {
-            console.log('Reposting all race results from database (oldest → newest)...');
-            const results = await this.db.getAllRaceResultsAsc();
-            let count = 0;
-            for (const result of results) {
-                // Build raceData, enriched with subsession details for laps and SoF
-                let raceData: any = { car_id: result.car_id, start_position: result.starting_position };
-                try {
-                    const subsession = await this.iracing.getSubsessionResult(result.subsession_id);
-                    if (subsession) {
-                        raceData.event_laps_complete = subsession.event_laps_complete;
-                        raceData.event_strength_of_field = subsession.event_strength_of_field;
-                        // Fallback to user's laps_complete if available
-                        const getType = (sr: any) => (sr?.simsession_type_name || sr?.simsession_name || sr?.session_type || '').toString();
-                        const raceSession = Array.isArray(subsession.session_results) ? subsession.session_results.find((sr: any) => /race/i.test(getType(sr)) && !/qual/i.test(getType(sr))) : null;
-                        const userRow = raceSession?.results?.find((r: any) => r.cust_id === result.iracing_customer_id);
-                        if (userRow && typeof userRow.laps_complete === 'number') {
-                            raceData.laps = userRow.laps_complete;
-                        }
-                    }
-                } catch {}
-                await this.postRaceResultToChannels(result, raceData);
-                count++;
+    // Compares a channel's ledger with what is actually in the channel. Ledger rows whose message is
+    // gone are dropped (the result will be reposted); messages for results no longer in the database
+    // and bot messages missing from the ledger (e.g. posted before the ledger existed) are deleted.
+    // Pinned messages are never deleted. Unlisted bot messages older than the oldest ledger entry are
+    // only seen while the ledger is empty, i.e. on the first run.
+    private async reconcileRaceLogChannel(channel: TextChannel, resultKeys: Set<string>): Promise<{ ledger: Map<string, { hash: string; message: Message }>; deleted: number }> {
+        const rows = await this.db.getRaceLogMessages(channel.id);
+        let oldestId: string | undefined = undefined;
+        for (const row of rows) {
+            if (oldestId === undefined || BigInt(row.message_id) < BigInt(oldestId)) oldestId = row.message_id;
+        }
+        const own = await this.fetchOwnMessages(channel, oldestId);
+        const ledger = new Map<string, { hash: string; message: Message }>();
+        const toDelete: Message[] = [];
+        for (const row of rows) {
+            const key = `${row.subsession_id}:${row.discord_id}`;
+            const message = own.get(row.message_id);
+            own.delete(row.message_id);
+            if (!message) {
+                await this.db.deleteRaceLogMessage(channel.id, row.message_id);
+            } else if (!resultKeys.has(key) || ledger.has(key)) {
+                if (!message.pinned) toDelete.push(message);
+                await this.db.deleteRaceLogMessage(channel.id, row.message_id);
+            } else {
+                ledger.set(key, { hash: row.render_hash, message });
             }
-            console.log(`Reposted ${count} results from database.`);
-        } catch (err) {
-            console.error('Error while reposting from database:', err);
         }
+        for (const message of own.values()) {
+            if (!message.pinned) toDelete.push(message);
+        }
+        if (toDelete.length > 0) await this.deleteMessages(channel, toDelete);
+        return { ledger, deleted: toDelete.length };
     }
 
     private async backfillRecentFromApiOldestFirst(): Promise<void> {
@@ -562,11 +753,8 @@ class iRacingBot {
                     const recent = await this.iracing.getMemberRecentRaces(user.iracing_customer_id);
                     if (!recent || recent.length === 0) continue;
                     // Filter to only races not in DB, then oldest-first
-                    const toProcess: any[] = [];
-                    for (const race of recent) {
-                        const exists = await this.db.getRaceResultExists(race.subsession_id, user.discord_id);
-                        if (!exists) toProcess.push(race);
-                    }
+                    const existing = await this.db.getExistingSubsessionIds(user.discord_id, recent.map(r => r.subsession_id));
+                    const toProcess: any[] = recent.filter(race => !existing.has(race.subsession_id));
                     toProcess.sort((a, b) => new Date(a.session_start_time).getTime() - new Date(b.session_start_time).getTime());
                     for (const race of toProcess) {
                         await this.processNewRaceResult(race, user);
@@ -581,19 +769,69 @@ class iRacingBot {
         }
     }
 
+    // Brings race log channels in line with the database using the posted-message ledger:
+    // only missing results are posted, stale ones edited and orphaned messages deleted.
     private async rebuildRaceLogsOnStartup(): Promise<void> {
         try {
             const raceLogChannels = await this.db.getAllRaceLogChannels();
             if (raceLogChannels.length === 0) return;
-            // Clear channels first
+            const started = Date.now();
+            const results = await this.db.getAllRaceResultsAsc();
+            const resultKeys = new Set(results.map(r => `${r.subsession_id}:${r.discord_id}`));
+
+            const targets: Array<RaceLogTarget & { ledger: Map<string, { hash: string; message: Message }> }> = [];
+            let deleted = 0;
             for (const logChannel of raceLogChannels) {
-                const channel = await this.client.channels.fetch(logChannel.channel_id);
-                if (channel && channel instanceof TextChannel) {
-                    await this.clearRaceLogChannel(channel);
+                try {
+                    const channel = await this.client.channels.fetch(logChannel.channel_id);
+                    if (!channel || !(channel instanceof TextChannel)) continue;
+                    const { ledger, deleted: removed } = await this.reconcileRaceLogChannel(channel, resultKeys);
+                    const prompts = await this.db.getGuildPrompts(logChannel.guild_id);
+                    targets.push({ channel, logChannel, prompts, ledger });
+                    deleted += removed;
+                } catch (err) {
+                    console.error(`Failed to reconcile race log channel ${logChannel.channel_id}:`, err);
+                }
+            }
+
+            // Work out what each result needs per channel before touching the API
+            const work: Array<{ result: RaceResult; jobs: Array<{ target: RaceLogTarget; existing?: Message }> }> = [];
+            let unchanged = 0;
+            for (const result of results) {
+                const key = `${result.subsession_id}:${result.discord_id}`;
+                const jobs: Array<{ target: RaceLogTarget; existing?: Message }> = [];
+                for (const target of targets) {
+                    const entry = target.ledger.get(key);
+                    if (!entry) jobs.push({ target });
+                    else if (entry.hash !== this.raceResultRenderHash(result, target.prompts)) jobs.push({ target, existing: entry.message });
+                    else unchanged++;
                 }
+                if (jobs.length > 0) work.push({ result, jobs });
             }
-            // Repost from DB oldest → newest
-            await this.repostAllFromDatabaseOldestFirst();
+
+            // Post/edit oldest → newest, loading subsession details in bulk batches. Each result is
+            // rendered once and sent to all of its channels in parallel, so per-channel order holds.
+            // Discord can't insert messages, so a result missing from an existing log lands at the bottom.
+            let posted = 0;
+            let edited = 0;
+            let subsessions = new Map<number, any>();
+            for (const [i, { result, jobs }] of work.entries()) {
+                if (i % 50 === 0) {
+                    subsessions = await this.iracing.getSubsessionResults(work.slice(i, i + 50).map(w => w.result.subsession_id));
+                }
+                const raceData = this.storedRaceData(result, subsessions.get(result.subsession_id));
+                try {
+                    const render = await this.buildRaceRender(result, raceData);
+                    const sent = await this.fanOutRaceResult(result, render, jobs);
+                    posted += sent.posted;
+                    edited += sent.edited;
+                } catch (err) {
+                    console.error(`Failed to render result ${result.subsession_id}:`, err);
+                }
+            }
+            metrics.observe('race_log_reconcile_duration_seconds', (Date.now() - started) / 1000);
+            console.log(`Race logs reconciled in ${((Date.now() - started) / 1000).toFixed(1)}s: ${posted} posted, ${edited} edited, ${deleted} deleted, ${unchanged} unchanged.`);
+
             // Fill gaps via API oldest → newest
             await this.backfillRecentFromApiOldestFirst();
         } catch (err) {
@@ -601,41 +839,31 @@ class iRacingBot {
         }
     }
 
-    private async createRaceResultEmbed(result: RaceResult, raceData: any, guildIdForPrompts?: string): Promise<{ embed: EmbedBuilder; attachment?: AttachmentBuilder }> {
-        const embed = new EmbedBuilder()
-            .setTitle(`🏁 ${result.series_name}`)
-            .setColor(this.getPositionColor(result.finish_position))
-            .setTimestamp(new Date(result.start_time));
-
-        let attachment: AttachmentBuilder | undefined;
+    // Everything about a result that doesn't depend on the destination guild: subsession detail,
+    // lap/event logs, WR delta, track map and car image. Built once per result and shared by
+    // every race log channel it is posted to.
+    private async buildRaceRender(result: RaceResult, raceData: any): Promise<RaceRender> {
+        let trackMapPng: Buffer | null = null;
+        let carImageUrl: string | null = null;
 
-        // Add track map if available
+        // Track map if available
         try {
             const trackMapPath = await this.iracing.getTrackMapActivePng(result.track_id);
-            if (trackMapPath) {
-                attachment = new AttachmentBuilder(trackMapPath, { name: 'track-map.png' });
-                embed.setImage('attachment://track-map.png');
-            }
+            if (trackMapPath) trackMapPng = await this.loadTrackMapPng(trackMapPath);
         } catch (error) {
             console.warn('Could not fetch track map:', error);
         }
 
-        // Add car image as thumbnail if available
+        // Car image for the thumbnail if available
         try {
-            const carImageUrl = await this.iracing.getCarImageUrl(raceData.car_id);
-            if (carImageUrl) {
-                embed.setThumbnail(carImageUrl);
-            }
+            carImageUrl = await this.iracing.getCarImageUrl(raceData.car_id);
         } catch (error) {
             console.warn('Could not fetch car image:', error);
         }
 
-        // Legacy field blocks removed — the AI or fallback description will provide a structured summary.
-
         // Precompute context values for AI and fallback
         let context: any = {};
         try {
-            const http = await this.iracing.getHttpClient();
             const subsession = await this.iracing.getSubsessionResult(result.subsession_id);
             const getType = (sr: any) => (sr?.simsession_type_name || sr?.simsession_name || sr?.session_type || '').toString();
             const raceSession = Array.isArray(subsession?.session_results)
@@ -718,8 +946,7 @@ class iRacingBot {
             // Position-by-lap trend (best-effort) via lap_chart_data
             let posTrend: { start?: number; end?: number; min?: number; max?: number } | undefined;
             try {
-                const lc = await http.get('/data/results/lap_chart_data', { params: { subsession_id: result.subsession_id, simsession_number: simsessionNumber } });
-                const lcd = lc.data?.link ? (await http.get(lc.data.link)).data : lc.data;
+                const lcd = await this.iracing.fetchMaybeS3('/data/results/lap_chart_data', { subsession_id: result.subsession_id, simsession_number: simsessionNumber });
                 // Heuristic: search for arrays keyed by driver/customer indicating position per lap
                 // We will try a few shapes defensively.
                 const extractPositions = (data: any): number[] | null => {
@@ -729,7 +956,6 @@ class iRacingBot {
                         const ci = data?.chunk_info;
                         if (ci && ci.base_download_url && Array.isArray(ci.chunk_file_names) && ci.chunk_file_names.length > 0) {
                             // Fetch and parse first chunk only
-                            // Note: we already have http available in scope
                             // But to keep simple and avoid another round trip, skip chunked here.
                             return null;
                         }
@@ -759,8 +985,7 @@ class iRacingBot {
             let pitStops: number | undefined;
             let cautions: number | undefined;
             try {
-                const ev = await http.get('/data/results/event_log', { params: { subsession_id: result.subsession_id, simsession_number: simsessionNumber } });
-                const evd = ev.data?.link ? (await http.get(ev.data.link)).data : ev.data;
+                const evd = await this.iracing.fetchMaybeS3('/data/results/event_log', { subsession_id: result.subsession_id, simsession_number: simsessionNumber });
                 const rows: any[] = Array.isArray(evd) ? evd : (Array.isArray(evd?.events) ? evd.events : []);
                 let pit = 0; let cau = 0;
                 for (const r of rows) {
@@ -779,28 +1004,17 @@ class iRacingBot {
             const eventCounts = new Map<string, number>();
             const lapAll: Array<{ lap: number; t: number; incident: boolean; events: string[] }> = [];
             try {
-                const lapResp = await http.get('/data/results/lap_data', {
-                    params: { subsession_id: result.subsession_id, simsession_number: simsessionNumber, cust_id: result.iracing_customer_id }
+                const lapMeta: any = await this.iracing.fetchMaybeS3('/data/results/lap_data', {
+                    subsession_id: result.subsession_id, simsession_number: simsessionNumber, cust_id: result.iracing_customer_id
                 });
-                const lapMeta = lapResp.data?.link ? (await http.get(lapResp.data.link)).data : lapResp.data;
-                const ci = lapMeta?.chunk_info;
-                if (ci && ci.base_download_url && Array.isArray(ci.chunk_file_names)) {
-                    const base = String(ci.base_download_url).replace(/\/$/, '/');
-                    for (const name of ci.chunk_file_names) {
-                        const url = base + name;
-                        try {
-                            const chunk = await http.get(url);
-                            const rows: any[] = Array.isArray(chunk.data) ? chunk.data : [];
-                            for (const r of rows) {
-                                if (r?.lap_number > 0 && r?.incident) incidentCount++;
-                                const evs: string[] = Array.isArray(r?.lap_events) ? r.lap_events : [];
-                                for (const e of evs) eventCounts.set(e, (eventCounts.get(e) || 0) + 1);
-                                if (typeof r?.lap_number === 'number' && r.lap_number > 0) {
-                                    const lt = typeof r?.lap_time === 'number' ? r.lap_time : -1;
-                                    lapAll.push({ lap: r.lap_number, t: lt, incident: !!r?.incident, events: evs });
-                                }
-                            }
-                        } catch {}
+                // Chunks download in parallel but rows arrive in lap order; failed chunks are skipped
+                for await (const r of this.iracing.iterateChunkRows<any>(lapMeta?.chunk_info, { onChunkError: () => {} })) {
+                    if (r?.lap_number > 0 && r?.incident) incidentCount++;
+                    const evs: string[] = Array.isArray(r?.lap_events) ? r.lap_events : [];
+                    for (const e of evs) eventCounts.set(e, (eventCounts.get(e) || 0) + 1);
+                    if (typeof r?.lap_number === 'number' && r.lap_number > 0) {
+                        const lt = typeof r?.lap_time === 'number' ? r.lap_time : -1;
+                        lapAll.push({ lap: r.lap_number, t: lt, incident: !!r?.incident, events: evs });
                     }
                 }
             } catch {}
@@ -855,6 +1069,43 @@ class iRacingBot {
             (context as any).performance = underperformed ? 'poor' : 'good';
         } catch {}
 
+        return { context, trackMapPng, carImageUrl };
+    }
+
+    // AI summary of a result for one guild prompt set. Summaries are stored per (result, prompt hash),
+    // so channels sharing a prompt set, later edits and reposts all reuse a single completion.
+    private async getRaceSummary(result: RaceResult, render: RaceRender, guildPrompts: string[]): Promise<string | null> {
+        const model = process.env.OPENROUTER_MODEL?.trim();
+        const apiKey = process.env.OPENROUTER_KEY?.trim();
+        if (!model || !apiKey) return null;
+        const guildPromptHeader = guildPrompts.join('\n');
+        const promptHash = createHash('sha256').update(guildPromptHeader).digest('hex').slice(0, 32);
+        const key = `${result.subsession_id}:${result.discord_id}:${promptHash}`;
+        let pending = this.summaryInFlight.get(key);
+        if (!pending) {
+            pending = (async () => {
+                try {
+                    const stored = await this.db.getAiSummary(result.subsession_id, result.discord_id, promptHash);
+                    metrics.inc('cache_lookups_total', { cache: 'ai_summary', result: stored !== null ? 'hit' : 'miss' });
+                    if (stored !== null) return stored;
+                    const summary = await metrics.time('ai_summary_duration_seconds', undefined, () => this.generateRaceSummary(result, render.context, guildPromptHeader, model, apiKey));
+                    if (summary) {
+                        await this.db.saveAiSummary({ subsession_id: result.subsession_id, discord_id: result.discord_id, prompt_hash: promptHash, model, summary });
+                    }
+                    return summary;
+                } catch (e) {
+                    // If AI summary fails, we silently skip.
+                    return null;
+                } finally {
+                    this.summaryInFlight.delete(key);
+                }
+            })();
+            this.summaryInFlight.set(key, pending);
+        }
+        return pending;
+    }
+
+    private async generateRaceSummary(result: RaceResult, context: any, guildPromptHeader: string, model: string, apiKey: string): Promise<string | null> {
         // Helper: compact event log digest for prompt context
         const buildEventLogDigest = (ctx: any): string => {
             try {
@@ -873,144 +1124,148 @@ class iRacingBot {
             } catch { return ''; }
         };
 
-        // Generate AI-crafted race summary via OpenRouter (optional)
+        const sys = 'You are Robin Miller writing race summaries for Discord embeds. Keep it concise to avoid exceeding discords text length limits.';
+        // Build recent history for this user (context for trend/news). Up to 30 prior events.
+        let historyBlock = '';
         try {
-            const model = process.env.OPENROUTER_MODEL?.trim();
-            const apiKey = process.env.OPENROUTER_KEY?.trim();
-            if (model && apiKey) {
-                const sys = 'You are Robin Miller writing race summaries for Discord embeds. Keep it concise to avoid exceeding discords text length limits.';
-                // Build recent history for this user (context for trend/news). Up to 30 prior events.
-                let historyBlock = '';
-                try {
-                    const recent = await this.db.getRecentRaceResults(result.discord_id, 32);
-                    if (Array.isArray(recent) && recent.length > 0) {
-                        const lines: string[] = [];
-                        for (const r of recent) {
-                            if (r.subsession_id === result.subsession_id) continue; // skip current
-                            const date = new Date(r.start_time).toISOString().slice(0, 10);
-                            const cfg = (r.config_name && r.config_name.length) ? ` (${r.config_name})` : '';
-                            // Enrich with subsession details where possible
-                            let sofStr = '';
-                            let lapsStr = '';
-                            let bestStr = '';
-                            let avgStr = '';
-                            let ptsStr = '';
-                            try {
-                                const ss = await this.iracing.getSubsessionResult(r.subsession_id);
-                                const getType2 = (sr: any) => (sr?.simsession_type_name || sr?.simsession_name || sr?.session_type || '').toString();
-                                const raceSess = Array.isArray(ss?.session_results) ? ss.session_results.find((sr: any) => /race/i.test(getType2(sr)) && !/qual/i.test(getType2(sr))) : null;
-                                const row = raceSess?.results?.find((x: any) => x.cust_id === r.iracing_customer_id);
-                                const sof = (typeof ss?.event_strength_of_field === 'number') ? ss.event_strength_of_field : undefined;
-                                if (typeof sof === 'number') sofStr = ` • SoF ${sof}`;
-                                const laps = (typeof row?.laps_complete === 'number') ? row.laps_complete : (typeof ss?.event_laps_complete === 'number' ? ss.event_laps_complete : undefined);
-                                if (typeof laps === 'number') lapsStr = ` • Laps ${laps}`;
-                                if (typeof row?.best_lap_time === 'number' && row.best_lap_time > 0) bestStr = ` • Best ${this.iracing.formatLapTime(row.best_lap_time)}`;
-                                if (typeof row?.average_lap === 'number' && row.average_lap > 0) avgStr = ` • Avg ${this.iracing.formatLapTime(row.average_lap)}`;
-                                if (typeof row?.champ_points === 'number') ptsStr = ` • Pts ${row.champ_points}`;
-                            } catch {}
-                            const startStr = (typeof r.starting_position === 'number') ? `Start ${r.starting_position} → ` : '';
-                            const irDelta = (typeof r.irating_before === 'number' && typeof r.irating_after === 'number') ? (r.irating_after - r.irating_before) : undefined;
-                            const deltaStr = (typeof irDelta === 'number') ? ` (${irDelta >= 0 ? '+' : ''}${irDelta})` : '';
-                            const irStr = (typeof r.irating_before === 'number' && typeof r.irating_after === 'number') ? ` • iR ${r.irating_before}→${r.irating_after}${deltaStr}` : '';
-                            const carStr = r.car_name ? ` • ${r.car_name}` : '';
-                            lines.push(`${date}: ${r.series_name} @ ${r.track_name}${cfg}${carStr} • ${startStr}P${r.finish_position} • ${r.incidents}x${lapsStr}${sofStr}${bestStr}${avgStr}${ptsStr}${irStr}`);
-                            if (lines.length >= 10) break;
-                        }
-                        if (lines.length > 0) historyBlock = lines.join('\n');
-                    }
-                } catch {}
-
-                const ask = [
-                    `Driver: ${result.iracing_username}`,
-                    `Series: ${result.series_name}`,
-                    `Track: ${result.track_name}${result.config_name ? ` (${result.config_name})` : ''}`,
-                    `Car: ${result.car_name}`,
-                    `Start → Finish: ${context.startPos ?? '?'} → ${context.finishPos ?? '?'}`,
-                    typeof context.posChange === 'number' ? `Net: ${context.posChange > 0 ? '+' : ''}${context.posChange}` : '',
-                    typeof context.lapsComplete === 'number' ? `Laps: ${context.lapsComplete}` : '',
-                    typeof context.sof === 'number' ? `SoF: ${context.sof}` : '',
-                    `Incidents: ${result.incidents}`,
-                    context.bestLap ? `Best Lap: ${context.bestLap.time} (L${context.bestLap.lap})` : '',
-                    context.avgLap ? `Avg Lap: ${context.avgLap}` : '',
-                    typeof context.champPoints === 'number' ? `Points: ${context.champPoints}` : '',
-                    typeof context.irDelta === 'number' ? `iRating: ${result.irating_before} → ${result.irating_after} (${context.irDelta >= 0 ? '+' : ''}${context.irDelta})` : '',
-                    context.gapToWinner ? `Gap to Winner: ${context.gapToWinner}` : '',
-                    context.eventsSummary ? `Notable: ${context.eventsSummary}` : '',
-                    context.lapHighlights ? `Lap Highlights: ${context.lapHighlights}` : '',
-                    context.qual?.time ? `Qual: ${context.qual.time}${context.qual.lap ? ` (L${context.qual.lap})` : ''}${typeof context.qual.position === 'number' ? `, P${context.qual.position}` : ''}` : '',
-                    typeof context.fieldSize === 'number' ? `Field: ${context.fieldSize}${typeof context.classPos === 'number' ? `, Class P${context.classPos}` : ''}` : '',
-                    context.raceBestLapTime ? `Race Best: ${context.raceBestLapTime}` : '',
-                    typeof context.wrDeltaPct === 'number' ? `% over WR: ${context.wrDeltaPct.toFixed(1)}%` : '',
-                    typeof context.pitStops === 'number' ? `Pit Stops: ${context.pitStops}` : '',
-                    typeof context.cautions === 'number' ? `Cautions: ${context.cautions}` : '',
-                    context.posTrend ? `Trend: start ${context.posTrend.start ?? '?'} → end ${context.posTrend.end ?? '?'} (min ${context.posTrend.min ?? '?'}, max ${context.posTrend.max ?? '?'})` : '',
-                ].filter(Boolean).join('\n');
-
-                const eventLogBlock = buildEventLogDigest(context);
-                // Fetch guild-specific prompt additions (prepended at the very top)
-                let guildPromptHeader = '';
-                try {
-                    if (guildIdForPrompts) {
-                        const extras = await this.db.getGuildPrompts(guildIdForPrompts);
-                        if (extras.length > 0) {
-                            guildPromptHeader = extras.join('\n');
-                        }
-                    }
-                } catch {}
-                const promptLines: string[] = [
-                    ...(guildPromptHeader ? [guildPromptHeader, ''] : []),
-                    'Recent Results (most recent first):',
-                    historyBlock,
-                    '',
-                    'Event Log (latest race):',
-                    eventLogBlock || '(none)',
-                    '',
-                    'Latest race data (primary focus):',
-                    ask,
-                    '',
-                    'Write a quick news report paragraph for a discord embed in the style of Robin Miller—evocative and witty yet precise—summarizing the latest race.',
-                    'Explicitly contextualize this performance vs the driver\'s recent results (positions, incidents, iRating trend, lap pace) using the provided history.',
-                    "Then add a 'Details' list with short labeled lines (headings with emojis) covering the most relevant numeric details from the latest race and the racers recent trends."
-                ];
-                const prompt = promptLines.join('\n');
-
-                const baseUrl = process.env.OPENROUTER_BASE?.trim() || 'https://openrouter.ai/api/v1';
-                const resp = await axios.post(
-                    `${baseUrl}/chat/completions`,
-                    {
-                        model,
-                        messages: [
-                            { role: 'system', content: sys },
-                            { role: 'user', content: prompt }
-                        ]
-                    },
-                    {
-                        headers: {
-                            'Authorization': `Bearer ${apiKey}`,
-                            'Content-Type': 'application/json',
-                            // Optional OpenRouter headers for attribution
-                            'HTTP-Referer': 'https://github.com/ericbriscoe/iracing-discord-bot',
-                            'X-Title': 'iRacing Discord Bot'
-                        },
-                        timeout: 15000
-                    }
-                );
-                const text = resp.data?.choices?.[0]?.message?.content?.toString?.() || '';
-                let summary = text.length > 1500 ? (text.slice(0, 1495) + '…') : text;
-                if (summary) {
-                    // Replace the user's iRacing name with a Discord mention (non-pinging via allowedMentions on send)
-                    const esc = (s: string) => s.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+            const recent = await this.db.getRecentRaceResults(result.discord_id, 32);
+            if (Array.isArray(recent) && recent.length > 0) {
+                const lines: string[] = [];
+                const prior = recent.filter(r => r.subsession_id !== result.subsession_id).slice(0, 10);
+                const priorSubsessions = await this.iracing.getSubsessionResults(prior.map(r => r.subsession_id));
+                for (const r of recent) {
+                    if (r.subsession_id === result.subsession_id) continue; // skip current
+                    const date = new Date(r.start_time).toISOString().slice(0, 10);
+                    const cfg = (r.config_name && r.config_name.length) ? ` (${r.config_name})` : '';
+                    // Enrich with subsession details where possible
+                    let sofStr = '';
+                    let lapsStr = '';
+                    let bestStr = '';
+                    let avgStr = '';
+                    let ptsStr = '';
                     try {
-                        // Case-insensitive, capture optional possessive 's or ’s and preserve it after the mention
-                        const nameRe = new RegExp(`\\b${esc(result.iracing_username)}((?:'s|’s)?)\\b`, 'gi');
-                        summary = summary.replace(nameRe, (_m: string, poss: string) => `<@${result.discord_id}>${poss || ''}`);
+                        const ss = priorSubsessions.get(r.subsession_id);
+                        const getType2 = (sr: any) => (sr?.simsession_type_name || sr?.simsession_name || sr?.session_type || '').toString();
+                        const raceSess = Array.isArray(ss?.session_results) ? ss.session_results.find((sr: any) => /race/i.test(getType2(sr)) && !/qual/i.test(getType2(sr))) : null;
+                        const row = raceSess?.results?.find((x: any) => x.cust_id === r.iracing_customer_id);
+                        const sof = (typeof ss?.event_strength_of_field === 'number') ? ss.event_strength_of_field : undefined;
+                        if (typeof sof === 'number') sofStr = ` • SoF ${sof}`;
+                        const laps = (typeof row?.laps_complete === 'number') ? row.laps_complete : (typeof ss?.event_laps_complete === 'number' ? ss.event_laps_complete : undefined);
+                        if (typeof laps === 'number') lapsStr = ` • Laps ${laps}`;
+                        if (typeof row?.best_lap_time === 'number' && row.best_lap_time > 0) bestStr = ` • Best ${this.iracing.formatLapTime(row.best_lap_time)}`;
+                        if (typeof row?.average_lap === 'number' && row.average_lap > 0) avgStr = ` • Avg ${this.iracing.formatLapTime(row.average_lap)}`;
+                        if (typeof row?.champ_points === 'number') ptsStr = ` • Pts ${row.champ_points}`;
                     } catch {}
-                    // Prefer description for better width; ensure within limit
-                    embed.setDescription(summary);
+                    const startStr = (typeof r.starting_position === 'number') ? `Start ${r.starting_position} → ` : '';
+                    const irDelta = (typeof r.irating_before === 'number' && typeof r.irating_after === 'number') ? (r.irating_after - r.irating_before) : undefined;
+                    const deltaStr = (typeof irDelta === 'number') ? ` (${irDelta >= 0 ? '+' : ''}${irDelta})` : '';
+                    const irStr = (typeof r.irating_before === 'number' && typeof r.irating_after === 'number') ? ` • iR ${r.irating_before}→${r.irating_after}${deltaStr}` : '';
+                    const carStr = r.car_name ? ` • ${r.car_name}` : '';
+                    lines.push(`${date}: ${r.series_name} @ ${r.track_name}${cfg}${carStr} • ${startStr}P${r.finish_position} • ${r.incidents}x${lapsStr}${sofStr}${bestStr}${avgStr}${ptsStr}${irStr}`);
+                    if (lines.length >= 10) break;
                 }
+                if (lines.length > 0) historyBlock = lines.join('\n');
             }
-        } catch (e) {
-            // If AI summary fails, we silently skip.
+        } catch {}
+
+        const ask = [
+            `Driver: ${result.iracing_username}`,
+            `Series: ${result.series_name}`,
+            `Track: ${result.track_name}${result.config_name ? ` (${result.config_name})` : ''}`,
+            `Car: ${result.car_name}`,
+            `Start → Finish: ${context.startPos ?? '?'} → ${context.finishPos ?? '?'}`,
+            typeof context.posChange === 'number' ? `Net: ${context.posChange > 0 ? '+' : ''}${context.posChange}` : '',
+            typeof context.lapsComplete === 'number' ? `Laps: ${context.lapsComplete}` : '',
+            typeof context.sof === 'number' ? `SoF: ${context.sof}` : '',
+            `Incidents: ${result.incidents}`,
+            context.bestLap ? `Best Lap: ${context.bestLap.time} (L${context.bestLap.lap})` : '',
+            context.avgLap ? `Avg Lap: ${context.avgLap}` : '',
+            typeof context.champPoints === 'number' ? `Points: ${context.champPoints}` : '',
+            typeof context.irDelta === 'number' ? `iRating: ${result.irating_before} → ${result.irating_after} (${context.irDelta >= 0 ? '+' : ''}${context.irDelta})` : '',
+            context.gapToWinner ? `Gap to Winner: ${context.gapToWinner}` : '',
+            context.eventsSummary ? `Notable: ${context.eventsSummary}` : '',
+            context.lapHighlights ? `Lap Highlights: ${context.lapHighlights}` : '',
+            context.qual?.time ? `Qual: ${context.qual.time}${context.qual.lap ? ` (L${context.qual.lap})` : ''}${typeof context.qual.position === 'number' ? `, P${context.qual.position}` : ''}` : '',
+            typeof context.fieldSize === 'number' ? `Field: ${context.fieldSize}${typeof context.classPos === 'number' ? `, Class P${context.classPos}` : ''}` : '',
+            context.raceBestLapTime ? `Race Best: ${context.raceBestLapTime}` : '',
+            typeof context.wrDeltaPct === 'number' ? `% over WR: ${context.wrDeltaPct.toFixed(1)}%` : '',
+            typeof context.pitStops === 'number' ? `Pit Stops: ${context.pitStops}` : '',
+            typeof context.cautions === 'number' ? `Cautions: ${context.cautions}` : '',
+            context.posTrend ? `Trend: start ${context.posTrend.start ?? '?'} → end ${context.posTrend.end ?? '?'} (min ${context.posTrend.min ?? '?'}, max ${context.posTrend.max ?? '?'})` : '',
+        ].filter(Boolean).join('\n');
+
+        const eventLogBlock = buildEventLogDigest(context);
+        const promptLines: string[] = [
+            ...(guildPromptHeader ? [guildPromptHeader, ''] : []),
+            'Recent Results (most recent first):',
+            historyBlock,
+            '',
+            'Event Log (latest race):',
+            eventLogBlock || '(none)',
+            '',
+            'Latest race data (primary focus):',
+            ask,
+            '',
+            'Write a quick news report paragraph for a discord embed in the style of Robin Miller—evocative and witty yet precise—summarizing the latest race.',
+            'Explicitly contextualize this performance vs the driver\'s recent results (positions, incidents, iRating trend, lap pace) using the provided history.',
+            "Then add a 'Details' list with short labeled lines (headings with emojis) covering the most relevant numeric details from the latest race and the racers recent trends."
+        ];
+        const prompt = promptLines.join('\n');
+
+        const baseUrl = process.env.OPENROUTER_BASE?.trim() || 'https://openrouter.ai/api/v1';
+        const resp = await axios.post(
+            `${baseUrl}/chat/completions`,
+            {
+                model,
+                messages: [
+                    { role: 'system', content: sys },
+                    { role: 'user', content: prompt }
+                ]
+            },
+            {
+                headers: {
+                    'Authorization': `Bearer ${apiKey}`,
+                    'Content-Type': 'application/json',
+                    // Optional OpenRouter headers for attribution
+                    'HTTP-Referer': 'https://github.com/ericbriscoe/iracing-discord-bot',
+                    'X-Title': 'iRacing Discord Bot'
+                },
+                timeout: 15000
+            }
+        );
+        const text = resp.data?.choices?.[0]?.message?.content?.toString?.() || '';
+        const summary = text.length > 1500 ? (text.slice(0, 1495) + '…') : text;
+        return summary || null;
+    }
+
+    private createRaceResultEmbed(result: RaceResult, render: RaceRender, summary: string | null): { embed: EmbedBuilder; attachment?: AttachmentBuilder } {
+        const context = render.context;
+        const embed = new EmbedBuilder()
+            .setTitle(`🏁 ${result.series_name}`)
+            .setColor(this.getPositionColor(result.finish_position))
+            .setTimestamp(new Date(result.start_time));
+
+        let attachment: AttachmentBuilder | undefined;
+        if (render.trackMapPng) {
+            // Every message gets its own upload so its image survives edits or deletion of any other post
+            attachment = new AttachmentBuilder(render.trackMapPng, { name: 'track-map.png' });
+            embed.setImage('attachment://track-map.png');
+        }
+        if (render.carImageUrl) {
+            embed.setThumbnail(render.carImageUrl);
+        }
+
+        if (summary) {
+            let text = summary;
+            // Replace the user's iRacing name with a Discord mention (non-pinging via allowedMentions on send)
+            const esc = (s: string) => s.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+            try {
+                // Case-insensitive, capture optional possessive 's or ’s and preserve it after the mention
+                const nameRe = new RegExp(`\\b${esc(result.iracing_username)}((?:'s|’s)?)\\b`, 'gi');
+                text = text.replace(nameRe, (_m: string, poss: string) => `<@${result.discord_id}>${poss || ''}`);
+            } catch {}
+            // Prefer description for better width; ensure within limit
+            embed.setDescription(text);
         }
 
         // Fallback: if no description yet, build a structured, emoji-labeled summary ourselves
@@ -1070,7 +1325,7 @@ class iRacingBot {
             await interaction.deferReply({ flags: [MessageFlags.Ephemeral] });
 
             const range = '90d';
-            const { imageBuffer, embed } = await this.buildHistoryResponse(interaction.user.id, linked.iracing_customer_id!, range);
+            const { imageBuffer, embed } = await this.buildHistoryResponse(interaction.user.id, range);
             const attachment = new AttachmentBuilder(imageBuffer, { name: 'history.png' });
             const rows = this.buildHistoryButtons(interaction.user.id, range);
             await interaction.editReply({ embeds: [embed], files: [attachment], components: rows });
@@ -1114,7 +1369,7 @@ class iRacingBot {
         }
         // Acknowledge quickly to avoid interaction expiry, then edit original message after heavy work
         try { await interaction.deferUpdate(); } catch {}
-        const { imageBuffer, embed } = await this.buildHistoryResponse(uid, linked.iracing_customer_id!, range);
+        const { imageBuffer, embed } = await this.buildHistoryResponse(uid, range);
         const attachment = new AttachmentBuilder(imageBuffer, { name: 'history.png' });
         const rows = this.buildHistoryButtons(uid, range);
         await interaction.editReply({ embeds: [embed], files: [attachment], components: rows });
@@ -1146,65 +1401,112 @@ class iRacingBot {
         return { trackId, carId, trackName, carName };
     }
 
-    private async buildHistoryResponse(discordId: string, customerId: number, range: string): Promise<{ imageBuffer: Buffer; embed: EmbedBuilder }> {
-        const { points, combos } = await this.collectHistoryPoints(discordId, customerId, range);
-        const svg = this.renderHistorySvg(points, { title: `All Tracks • All Cars`, range });
-        const imageBuffer = await sharp(Buffer.from(svg)).png().toBuffer();
+    private async buildHistoryResponse(discordId: string, range: string): Promise<{ imageBuffer: Buffer; embed: EmbedBuilder }> {
+        // Rendered charts are reused until the user's pace data changes or the day rolls over
+        const day = Math.floor(Date.now() / (24 * 60 * 60 * 1000));
+        const cacheKey = `${discordId}:${range}:${this.paceVersions.get(discordId) ?? 0}:${day}`;
+        const endTimer = metrics.startTimer('history_build_duration_seconds');
+        let chart = this.historyImageCache.get(cacheKey);
+        const cacheResult = chart ? 'hit' : 'miss';
+        metrics.inc('cache_lookups_total', { cache: 'history_image', result: cacheResult });
+        if (chart) {
+            this.historyImageCache.delete(cacheKey);
+        } else {
+            const { points, combos } = await this.collectHistoryPoints(discordId, range);
+            const svg = this.renderHistorySvg(points, { title: `All Tracks • All Cars`, range });
+            const imageBuffer = await sharp(Buffer.from(svg)).png().toBuffer();
+            chart = { imageBuffer, points: points.length, combos };
+        }
+        // Key by the version after collecting, which may have backfilled pace
+        this.historyImageCache.set(`${discordId}:${range}:${this.paceVersions.get(discordId) ?? 0}:${day}`, chart);
+        while (this.historyImageCache.size > 50) {
+            const oldest = this.historyImageCache.keys().next().value;
+            if (oldest === undefined) break;
+            this.historyImageCache.delete(oldest);
+        }
+        endTimer({ cache: cacheResult });
 
         const embed = new EmbedBuilder()
             .setTitle('Lap vs World Record')
             .setDescription(`All tracks and cars`)
             .addFields(
-                { name: 'Points', value: String(points.length), inline: true },
+                { name: 'Points', value: String(chart.points), inline: true },
                 { name: 'Range', value: range.toUpperCase(), inline: true },
-                { name: 'Combos', value: String(combos), inline: true }
+                { name: 'Combos', value: String(chart.combos), inline: true }
             )
             .setImage('attachment://history.png')
             .setColor(0x3b82f6);
 
-        return { imageBuffer, embed };
+        return { imageBuffer: chart.imageBuffer, embed };
     }
 
-    private async collectHistoryPoints(discordId: string, customerId: number, range: string): Promise<{ points: Array<{ t: number; y: number }>; combos: number }> {
-        const all = await this.db.getRaceResultsForUserAsc(discordId);
-        const cutoff = this.rangeToCutoff(range);
-        const filtered = cutoff ? all.filter(r => new Date(r.start_time).getTime() >= cutoff) : all;
-        // Build unique car/track combos and prefetch WRs
-        const comboKeys = new Set<string>();
-        for (const r of filtered) comboKeys.add(`${r.car_id}:${r.track_id}`);
-        const wrCache = new Map<string, number | undefined>();
-        const combos = Array.from(comboKeys);
-        const limit = 6;
-        for (let i = 0; i < combos.length; i += limit) {
-            const batch = combos.slice(i, i + limit).map(async (key) => {
-                const parts = key.split(':');
-                const carStr = parts[0] || '0';
-                const trackStr = parts[1] || '0';
-                const wr = await this.iracing.getWorldRecordBestLap(parseInt(carStr, 10), parseInt(trackStr, 10));
-                wrCache.set(key, wr ?? undefined);
-            });
-            await Promise.all(batch);
+    private async collectHistoryPoints(discordId: string, range: string): Promise<{ points: Array<{ t: number; y: number }>; combos: number }> {
+        // Lazily backfill pace for results stored before it was materialized (or whose lookups failed)
+        const missing = await this.db.getResultsMissingPace(discordId);
+        for (let i = 0; i < missing.length; i += 200) {
+            await this.updateRacePace(missing.slice(i, i + 200));
         }
-        // Collect points with basic caching of per-subsesson best lap
-        const bestLapCache = new Map<number, number | null>();
+        const rows = await this.db.getPaceHistory(discordId, this.rangeToCutoff(range));
+        const comboKeys = new Set<string>();
         const points: Array<{ t: number; y: number }> = [];
-        for (const r of filtered) {
-            let best = bestLapCache.get(r.subsession_id) ?? null;
-            if (best === null && !bestLapCache.has(r.subsession_id)) {
-                best = await this.getUserBestRaceLap(r.subsession_id, customerId);
-                bestLapCache.set(r.subsession_id, best);
-            }
-            const wr = wrCache.get(`${r.car_id}:${r.track_id}`);
-            if (!best || !wr || wr <= 0) continue;
-            const pct = ((best - wr) / wr) * 100;
+        for (const r of rows) {
+            // Combos count every race in range, as before pace was materialized
+            comboKeys.add(`${r.car_id}:${r.track_id}`);
             // Eliminate outliers more than 50% slower than the WR
-            if (pct > 50) continue;
-            const t = new Date(r.start_time).getTime();
-            points.push({ t, y: pct });
+            if (r.pct_over_wr === null || r.pct_over_wr > 50) continue;
+            points.push({ t: r.start_ts, y: r.pct_over_wr });
         }
         return { points, combos: comboKeys.size };
     }
 
+    private bumpPaceVersion(discordId: string): void {
+        this.paceVersions.set(discordId, (this.paceVersions.get(discordId) ?? 0) + 1);
+    }
+
+    // Stores each result's best race lap and % over the car/track WR. Results whose subsession or WR
+    // couldn't be loaded are retried with backoff, then marked done without a pace.
+    private async updateRacePace(results: RaceResult[]): Promise<void> {
+        if (results.length === 0) return;
+        const subsessions = await this.iracing.getSubsessionResults(results.map(r => r.subsession_id));
+        const wrs = await this.iracing.getWorldRecords(results.map(r => ({ carId: r.car_id, trackId: r.track_id })), { concurrency: 6 });
+        const paces: RacePace[] = [];
+        const deferrals: PaceDeferral[] = [];
+        const defer = (r: RaceResult) => {
+            const attempts = (r.pace_attempts ?? 0) + 1;
+            deferrals.push({
+                subsession_id: r.subsession_id,
+                discord_id: r.discord_id,
+                attempts,
+                retry_at: attempts >= PACE_MAX_ATTEMPTS ? null : Date.now() + PACE_RETRY_BASE_MS * 4 ** (attempts - 1)
+            });
+        };
+        for (const r of results) {
+            const subsession = subsessions.get(r.subsession_id);
+            if (!subsession) {
+                defer(r);
+                continue;
+            }
+            const best = this.userBestRaceLap(subsession, r.iracing_customer_id);
+            const record = wrs.get(`${r.car_id}:${r.track_id}`);
+            const wr = record?.lapTime;
+            // A partial WR download would store a pace against a slower lap than the real record
+            if (best !== null && (!wr || wr <= 0 || !record?.complete)) {
+                defer(r);
+                continue;
+            }
+            paces.push({
+                subsession_id: r.subsession_id,
+                discord_id: r.discord_id,
+                best_lap_time: best,
+                wr_lap_time: wr ?? null,
+                pct_over_wr: best !== null && wr ? ((best - wr) / wr) * 100 : null
+            });
+        }
+        await this.db.setRaceResultPace(paces);
+        await this.db.deferRaceResultPace(deferrals);
+        for (const discordId of new Set(paces.map(p => p.discord_id))) this.bumpPaceVersion(discordId);
+    }
+
     private rangeToCutoff(range: string): number | null {
         const now = Date.now();
         const day = 24 * 60 * 60 * 1000;
@@ -1218,11 +1520,10 @@ class iRacingBot {
         }
     }
 
-    private async getUserBestRaceLap(subsessionId: number, customerId: number): Promise<number | null> {
-        const ss = await this.iracing.getSubsessionResult(subsessionId);
-        if (!ss || !Array.isArray(ss.session_results)) return null;
+    private userBestRaceLap(subsession: any, customerId: number): number | null {
+        if (!subsession || !Array.isArray(subsession.session_results)) return null;
         const getType = (sr: any) => (sr?.simsession_type_name || sr?.simsession_name || sr?.session_type || '').toString();
-        const raceSession = ss.session_results.find((sr: any) => /race/i.test(getType(sr)) && !/qual/i.test(getType(sr)));
+        const raceSession = subsession.session_results.find((sr: any) => /race/i.test(getType(sr)) && !/qual/i.test(getType(sr)));
         const row = raceSession?.results?.find((x: any) => x.cust_id === customerId);
         const best = row?.best_lap_time;
         return typeof best === 'number' && best > 0 ? best : null;
@@ -1245,7 +1546,7 @@ class iRacingBot {
 
         const path = points.map((p, i) => `${i === 0 ? 'M' : 'L'} ${xScale(p.t).toFixed(1)} ${yScale(p.y).toFixed(1)}`).join(' ');
 
-        const loess = this.loessSmooth(points, { resolution: Math.min(300, Math.max(120, points.length * 8)), robust: true });
+        const loess = loessSmooth(points, { resolution: Math.min(300, Math.max(120, points.length * 8)), robust: true });
 
         const yTicks = 5;
         const ticks: number[] = [];
@@ -1300,95 +1601,6 @@ class iRacingBot {
         return { m, b: b - m * x0 };
     }
 
-    private loessSmooth(points: Array<{ t: number; y: number }>, opts?: { span?: number; resolution?: number; robust?: boolean }): Array<{ t: number; y: number }> {
-        const pts = points.slice().sort((a, b) => a.t - b.t);
-        const n = pts.length;
-        if (n === 0) return [];
-        if (n === 1) return [pts[0]!];
-        // Adaptive span: for small datasets, increase span for a looser, smoother fit
-        const autoSpan = n <= 20 ? 0.85 : n <= 50 ? 0.65 : 0.45;
-        const span = Math.min(0.95, Math.max(0.2, opts?.span ?? autoSpan));
-        const k = Math.max(2, Math.ceil(span * n));
-        const xs = pts.map(p => p.t);
-        const ys = pts.map(p => p.y);
-        const minX = xs[0]!;
-        const maxX = xs[n - 1]!;
-        // Higher resolution for smoother visual line regardless of point count
-        const resolution = Math.max(100, Math.min(360, opts?.resolution ?? 240));
-        const evalXs: number[] = [];
-        if (resolution >= n) {
-            for (const x of xs) evalXs.push(x);
-        } else {
-            const step = (maxX - minX) / (resolution - 1 || 1);
-            for (let i = 0; i < resolution; i++) evalXs.push(minX + i * step);
-        }
-        // Local weighted regression
-        const yhatAt = (x0: number, robustW?: number[]): number => {
-            const distances = xs.map((x, idx) => ({ idx, d: Math.abs((x as number) - x0) }));
-            distances.sort((a, b) => a.d - b.d);
-            const window = distances.slice(0, k);
-            const last = window[window.length - 1];
-            const dmax = (last ? last.d : 0) || 1e-9;
-            let Sw = 0, Sx = 0, Sy = 0, Sxx = 0, Sxy = 0;
-            for (const { idx, d } of window) {
-                const u = d / dmax;
-                let w = (1 - Math.pow(u, 3)) ** 3; // tricube weight
-                if (robustW && typeof robustW[idx] === 'number') w *= robustW[idx]!;
-                const x = xs[idx]!;
-                const y = ys[idx]!;
-                Sw += w;
-                Sx += w * x;
-                Sy += w * y;
-                Sxx += w * x * x;
-                Sxy += w * x * y;
-            }
-            const denom = Sw * Sxx - Sx * Sx;
-            if (Math.abs(denom) < 1e-12 || Sw === 0) return Sy / (Sw || 1);
-            const a = (Sxx * Sy - Sx * Sxy) / denom;
-            const b = (Sw * Sxy - Sx * Sy) / denom;
-            return a + b * x0;
-        };
-        // Initial fit at data x's
-        const initialFits: number[] = xs.map(x0 => yhatAt(x0!));
-        // Up to two robust iterations to downweight outliers strongly
-        let robustW: number[] | undefined = undefined;
-        if (opts?.robust !== false) {
-            const computeRobustWeights = (fits: number[]): number[] => {
-                const residuals = ys.map((y, i) => (y as number) - fits[i]!);
-                const absRes = residuals.map(r => Math.abs(r)).sort((a, b) => a - b);
-                const median = absRes.length > 0
-                    ? (absRes.length % 2 === 1
-                        ? absRes[(absRes.length - 1) >> 1]!
-                        : ((absRes[absRes.length / 2 - 1]! + absRes[absRes.length / 2]!) / 2))
-                    : 0;
-                const s = median > 0 ? 4.685 * median : 1e-6; // stronger downweight
-                return residuals.map(r => {
-                    const u = Math.abs(r) / s;
-                    if (u >= 1) return 0;
-                    return (1 - u * u) ** 2; // Tukey bisquare
-                });
-            };
-            robustW = computeRobustWeights(initialFits);
-            // second pass fits
-            const secondFits = xs.map(x0 => yhatAt(x0!, robustW));
-            robustW = computeRobustWeights(secondFits);
-        }
-        // Evaluate and then apply a light moving-average on outputs to ensure smoothness
-        const out: Array<{ t: number; y: number }> = [];
-        for (const x0 of evalXs) out.push({ t: x0, y: yhatAt(x0, robustW) });
-        const smoothed: Array<{ t: number; y: number }> = [];
-        const win = Math.max(3, Math.floor(Math.min(13, Math.round(resolution / 30)))); // small window
-        const half = Math.floor(win / 2);
-        for (let i = 0; i < out.length; i++) {
-            let sum = 0, cnt = 0;
-            for (let j = i - half; j <= i + half; j++) {
-                if (j >= 0 && j < out.length) { sum += out[j]!.y; cnt++; }
-            }
-            smoothed.push({ t: out[i]!.t, y: cnt > 0 ? sum / cnt : out[i]!.y });
-        }
-        return smoothed;
-    }
-
     private getPositionColor(position: number): number {
         if (position === 1) return 0xFFD700; // Gold
         if (position <= 3) return 0xC0C0C0; // Silver
@@ -1411,6 +1623,11 @@ class iRacingBot {
             throw new Error('DISCORD_TOKEN environment variable not set');
         }
 
+        const metricsPort = parseInt(process.env.METRICS_PORT || '', 10);
+        if (metricsPort > 0) {
+            this.metricsServer = startMetricsServer(metricsPort, process.env.METRICS_HOST?.trim() || undefined);
+        }
+
         await this.client.login(token);
     }
 
@@ -1421,28 +1638,37 @@ class iRacingBot {
         if (this.raceResultUpdateInterval) {
             clearInterval(this.raceResultUpdateInterval);
         }
+        this.iracing.stopAssetRefresh();
+        this.metricsServer?.close();
         this.db.close();
         await this.client.destroy();
     }
 }
 
-// Start the bot
-const bot = new iRacingBot();
-
-bot.start().catch(error => {
-    console.error('Failed to start bot:', error);
-    process.exit(1);
-});
-
-// Handle graceful shutdown
-process.on('SIGINT', async () => {
-    console.log('Received SIGINT, shutting down gracefully...');
-    await bot.stop();
-    process.exit(0);
-});
-
-process.on('SIGTERM', async () => {
-    console.log('Received SIGTERM, shutting down gracefully...');
-    await bot.stop();
-    process.exit(0);
-});
+if (require.main === module) {
+    // Start the bot
+    const bot = new iRacingBot();
+
+    bot.start().catch(error => {
+        console.error('Failed to start bot:', error);
+        process.exit(1);
+    });
+
+    // Handle graceful shutdown
+    process.on('SIGINT', async () => {
+        console.log('Received SIGINT, shutting down gracefully...');
+        await bot.stop();
+        process.exit(0);
+    });
+
+    process.on('SIGTERM', async () => {
+        console.log('Received SIGTERM, shutting down gracefully...');
+        await bot.stop();
+        process.exit(0);
+    });
+
+    // Dump current metrics to the log without needing METRICS_PORT
+    process.on('SIGUSR2', () => {
+        console.log(metrics.render());
+    });
+}
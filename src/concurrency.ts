@@ -0,0 +1,17 @@
+// Run an async mapper over items with at most `limit` calls in flight.
+// Results are returned in input order; a rejected call rejects the whole batch.
+export async function mapWithConcurrency<T, R>(items: readonly T[], limit: number, fn: (item: T, index: number) => Promise<R>): Promise<R[]> {
+    const results = new Array<R>(items.length);
+    let next = 0;
+    const worker = async (): Promise<void> => {
+        while (next < items.length) {
+            const index = next++;
+            results[index] = await fn(items[index]!, index);
+        }
+    };
+    const workers: Promise<void>[] = [];
+    const count = Math.max(1, Math.min(limit, items.length));
+    for (let i = 0; i < count; i++) workers.push(worker());
+    await Promise.all(workers);
+    return results;
+}
@@ -1,5 +1,4 @@
 import sqlite3 from 'sqlite3';
-import { promisify } from 'util';
 import * as fs from 'fs';
 import * as path from 'path';
 
@@ -52,6 +51,7 @@ export interface RaceResult {
     car_id: number;
     car_name: string;
     start_time: string;
+    start_ts?: number; // start_time as epoch ms, maintained by the database layer
     finish_position: number;
     starting_position?: number;
     incidents: number;
@@ -63,6 +63,37 @@ export interface RaceResult {
     official_session: boolean;
     created_at: string;
     last_updated: string;
+    // Pace versus the world record, filled in after ingest (1/10000 s laps)
+    best_lap_time?: number | null;
+    wr_lap_time?: number | null;
+    pct_over_wr?: number | null;
+    pace_updated_at?: number | null;
+    pace_attempts?: number;
+    pace_retry_at?: number | null;
+}
+
+export interface RacePace {
+    subsession_id: number;
+    discord_id: string;
+    best_lap_time: number | null;
+    wr_lap_time: number | null;
+    pct_over_wr: number | null;
+}
+
+// A pace lookup that could not be resolved (subsession or WR unavailable)
+export interface PaceDeferral {
+    subsession_id: number;
+    discord_id: string;
+    attempts: number;
+    // When the row becomes eligible again, or null to give up and mark it done without a pace
+    retry_at: number | null;
+}
+
+export interface PacePoint {
+    start_ts: number;
+    pct_over_wr: number | null;
+    car_id: number;
+    track_id: number;
 }
 
 export interface RaceLogChannel {
@@ -71,9 +102,178 @@ export interface RaceLogChannel {
     created_at: string;
 }
 
+// Ledger of race result messages the bot has posted, used to reconcile channels on startup
+export interface RaceLogMessage {
+    subsession_id: number;
+    discord_id: string;
+    channel_id: string;
+    message_id: string;
+    render_hash: string;
+    posted_at?: string;
+}
+
+// AI race summary stored per result and guild prompt set (prompt_hash), so reposts reuse it
+export interface AiSummary {
+    subsession_id: number;
+    discord_id: string;
+    prompt_hash: string;
+    model: string;
+    summary: string;
+    created_at?: string;
+}
+
+// Fastest world record lap (1/10000 s) for a car/track, season and session type. Season 0/0 is all-time;
+// a null lap_time records that the combination has no record so it isn't fetched again before expiry.
+export interface WorldRecordRow {
+    car_id: number;
+    track_id: number;
+    season_year: number;
+    season_quarter: number;
+    session_type: string;
+    lap_time: number | null;
+    fetched_at: number;
+    expires_at: number;
+}
+
+export interface WorldRecordKey {
+    car_id: number;
+    track_id: number;
+    season_year: number;
+    season_quarter: number;
+}
+
+// Schema migrations applied in order on startup; PRAGMA user_version records the last one run.
+const MIGRATIONS: Array<{ version: number; statements: string[] }> = [
+    {
+        version: 1,
+        statements: [
+            // Sortable epoch-ms start time; start_time strings don't order reliably and datetime() defeats indexes
+            `ALTER TABLE race_results ADD COLUMN start_ts INTEGER`,
+            `UPDATE race_results SET start_ts = CAST(ROUND((julianday(start_time) - 2440587.5) * 86400000) AS INTEGER) WHERE start_ts IS NULL`,
+            `CREATE INDEX IF NOT EXISTS idx_race_results_user_time ON race_results (discord_id, start_ts, id)`,
+            `CREATE INDEX IF NOT EXISTS idx_race_results_time ON race_results (start_ts, id)`,
+            `CREATE INDEX IF NOT EXISTS idx_race_results_track_car ON race_results (track_id, car_id)`,
+            `CREATE INDEX IF NOT EXISTS idx_guild_prompts_guild ON guild_prompts (guild_id, created_at, id)`
+        ]
+    },
+    {
+        version: 2,
+        statements: [
+            `CREATE TABLE IF NOT EXISTS race_log_messages (
+                subsession_id INTEGER NOT NULL,
+                discord_id TEXT NOT NULL,
+                channel_id TEXT NOT NULL,
+                message_id TEXT NOT NULL,
+                render_hash TEXT NOT NULL,
+                posted_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (subsession_id, discord_id, channel_id)
+            )`,
+            `CREATE INDEX IF NOT EXISTS idx_race_log_messages_channel ON race_log_messages (channel_id, message_id)`
+        ]
+    },
+    {
+        version: 3,
+        statements: [
+            `CREATE TABLE IF NOT EXISTS ai_summaries (
+                subsession_id INTEGER NOT NULL,
+                discord_id TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (subsession_id, discord_id, prompt_hash)
+            )`
+        ]
+    },
+    {
+        version: 4,
+        statements: [
+            `CREATE TABLE IF NOT EXISTS world_records (
+                car_id INTEGER NOT NULL,
+                track_id INTEGER NOT NULL,
+                season_year INTEGER NOT NULL,
+                season_quarter INTEGER NOT NULL,
+                session_type TEXT NOT NULL,
+                lap_time INTEGER,
+                fetched_at INTEGER NOT NULL,
+                expires_at INTEGER NOT NULL,
+                PRIMARY KEY (car_id, track_id, season_year, season_quarter, session_type)
+            )`
+        ]
+    },
+    {
+        version: 5,
+        statements: [
+            `ALTER TABLE race_results ADD COLUMN best_lap_time INTEGER`,
+            `ALTER TABLE race_results ADD COLUMN wr_lap_time INTEGER`,
+            `ALTER TABLE race_results ADD COLUMN pct_over_wr REAL`,
+            `ALTER TABLE race_results ADD COLUMN pace_updated_at INTEGER`,
+            // Covers the /history chart query
+            `CREATE INDEX IF NOT EXISTS idx_race_results_pace ON race_results (discord_id, start_ts, pct_over_wr, car_id, track_id)`
+        ]
+    },
+    {
+        version: 6,
+        statements: [
+            // Failed pace lookups back off instead of being retried on every /history
+            `ALTER TABLE race_results ADD COLUMN pace_attempts INTEGER NOT NULL DEFAULT 0`,
+            `ALTER TABLE race_results ADD COLUMN pace_retry_at INTEGER`
+        ]
+    }
+];
+
+// SQLite's default SQLITE_MAX_VARIABLE_NUMBER is 999 on older builds
+const MAX_IN_PARAMS = 500;
+const MAX_WORLD_RECORD_KEYS = MAX_IN_PARAMS / 4;
+
+// SET expressions see the stored row, so this compares the incoming car/track with the old ones
+const PACE_COMBO_CHANGED = `(excluded.car_id IS NOT race_results.car_id OR excluded.track_id IS NOT race_results.track_id)`;
+
+const RACE_RESULT_UPSERT = `
+    INSERT INTO race_results (
+        subsession_id, discord_id, iracing_customer_id, iracing_username,
+        series_id, series_name, track_id, track_name, config_name,
+        car_id, car_name, start_time, start_ts, finish_position, starting_position,
+        incidents, irating_before, irating_after, license_level_before,
+        license_level_after, event_type, official_session
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (subsession_id, discord_id) DO UPDATE SET
+        iracing_customer_id = excluded.iracing_customer_id,
+        iracing_username = excluded.iracing_username,
+        series_id = excluded.series_id,
+        series_name = excluded.series_name,
+        track_id = excluded.track_id,
+        track_name = excluded.track_name,
+        config_name = excluded.config_name,
+        car_id = excluded.car_id,
+        car_name = excluded.car_name,
+        start_time = excluded.start_time,
+        start_ts = excluded.start_ts,
+        finish_position = excluded.finish_position,
+        starting_position = excluded.starting_position,
+        incidents = excluded.incidents,
+        irating_before = excluded.irating_before,
+        irating_after = excluded.irating_after,
+        license_level_before = excluded.license_level_before,
+        license_level_after = excluded.license_level_after,
+        event_type = excluded.event_type,
+        official_session = excluded.official_session,
+        -- Pace is per car/track; a different combo is recomputed from scratch
+        best_lap_time = CASE WHEN ${PACE_COMBO_CHANGED} THEN NULL ELSE best_lap_time END,
+        wr_lap_time = CASE WHEN ${PACE_COMBO_CHANGED} THEN NULL ELSE wr_lap_time END,
+        pct_over_wr = CASE WHEN ${PACE_COMBO_CHANGED} THEN NULL ELSE pct_over_wr END,
+        pace_updated_at = CASE WHEN ${PACE_COMBO_CHANGED} THEN NULL ELSE pace_updated_at END,
+        pace_attempts = CASE WHEN ${PACE_COMBO_CHANGED} THEN 0 ELSE pace_attempts END,
+        pace_retry_at = CASE WHEN ${PACE_COMBO_CHANGED} THEN NULL ELSE pace_retry_at END,
+        last_updated = CURRENT_TIMESTAMP`;
+
+type RunResult = { changes: number; lastID: number };
+
 export class Database {
     private db: sqlite3.Database;
     private dbPath: string;
+    private statements = new Map<string, sqlite3.Statement>();
+    private writeQueue: Promise<unknown> = Promise.resolve();
 
     constructor(dbPath: string = 'data/data.db') {
         this.dbPath = dbPath;
@@ -87,10 +287,85 @@ export class Database {
         this.db = new sqlite3.Database(dbPath);
     }
 
+    // Prepared statements are cached per SQL string for the lifetime of the connection
+    private statement(sql: string): sqlite3.Statement {
+        let stmt = this.statements.get(sql);
+        if (!stmt) {
+            stmt = this.db.prepare(sql, (err) => {
+                if (err) this.statements.delete(sql);
+            });
+            this.statements.set(sql, stmt);
+        }
+        return stmt;
+    }
+
+    // Writes share one connection, so they are queued behind any open transaction instead of joining it
+    private run(sql: string, params: any[] = []): Promise<RunResult> {
+        return this.enqueueWrite(() => this.runNow(sql, params));
+    }
+
+    private runNow(sql: string, params: any[] = []): Promise<RunResult> {
+        return new Promise((resolve, reject) => {
+            this.statement(sql).run(params, function(err) {
+                if (err) reject(err);
+                else resolve({ changes: this.changes, lastID: this.lastID });
+            });
+        });
+    }
+
+    private all<T>(sql: string, params: any[] = []): Promise<T[]> {
+        return new Promise((resolve, reject) => {
+            this.statement(sql).all<T>(params, (err, rows) => {
+                if (err) reject(err);
+                else resolve(rows || []);
+            });
+        });
+    }
+
+    // Uses all() so the statement is always reset and never holds a read snapshot open
+    private async get<T>(sql: string, params: any[] = []): Promise<T | null> {
+        const rows = await this.all<T>(sql, params);
+        return rows[0] ?? null;
+    }
+
+    private exec(sql: string): Promise<void> {
+        return new Promise((resolve, reject) => {
+            this.db.exec(sql, (err) => {
+                if (err) reject(err);
+                else resolve();
+            });
+        });
+    }
+
+    private enqueueWrite<T>(fn: () => Promise<T>): Promise<T> {
+        const next = this.writeQueue.then(fn);
+        this.writeQueue = next.catch(() => undefined);
+        return next;
+    }
+
+    // Runs fn inside BEGIN IMMEDIATE/COMMIT as a single entry of the write queue. fn must write through
+    // the runner it is given, one statement at a time, so a failure never leaves siblings queued after ROLLBACK.
+    private transaction<T>(fn: (run: (sql: string, params?: any[]) => Promise<RunResult>) => Promise<T>): Promise<T> {
+        return this.enqueueWrite(async () => {
+            await this.exec('BEGIN IMMEDIATE');
+            try {
+                const result = await fn((sql, params) => this.runNow(sql, params));
+                await this.exec('COMMIT');
+                return result;
+            } catch (error) {
+                try { await this.exec('ROLLBACK'); } catch {}
+                throw error;
+            }
+        });
+    }
+
     async initDb(): Promise<void> {
-        const run = promisify(this.db.run.bind(this.db));
+        // WAL lets readers proceed while the pollers write; NORMAL sync is durable enough under WAL
+        await this.exec('PRAGMA journal_mode = WAL');
+        await this.exec('PRAGMA synchronous = NORMAL');
+        await this.exec('PRAGMA busy_timeout = 5000');
         
-        await run(`
+        await this.exec(`
             CREATE TABLE IF NOT EXISTS user_links (
                 discord_id TEXT PRIMARY KEY,
                 iracing_username TEXT NOT NULL,
@@ -99,7 +374,7 @@ export class Database {
             )
         `);
         
-        await run(`
+        await this.exec(`
             CREATE TABLE IF NOT EXISTS official_series (
                 series_id INTEGER PRIMARY KEY,
                 series_name TEXT NOT NULL,
@@ -110,7 +385,7 @@ export class Database {
             )
         `);
         
-        await run(`
+        await this.exec(`
             CREATE TABLE IF NOT EXISTS channel_tracks (
                 channel_id TEXT PRIMARY KEY,
                 guild_id TEXT NOT NULL,
@@ -121,7 +396,7 @@ export class Database {
             )
         `);
         
-        await run(`
+        await this.exec(`
             CREATE TABLE IF NOT EXISTS track_car_combos (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 series_id INTEGER NOT NULL,
@@ -136,7 +411,7 @@ export class Database {
             )
         `);
         
-        await run(`
+        await this.exec(`
             CREATE TABLE IF NOT EXISTS race_results (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 subsession_id INTEGER NOT NULL,
@@ -167,7 +442,7 @@ export class Database {
             )
         `);
 
-        await run(`
+        await this.exec(`
             CREATE TABLE IF NOT EXISTS race_log_channels (
                 channel_id TEXT PRIMARY KEY,
                 guild_id TEXT NOT NULL,
@@ -176,7 +451,7 @@ export class Database {
         `);
 
         // Server-specific prompt additions prepended to AI prompts
-        await run(`
+        await this.exec(`
             CREATE TABLE IF NOT EXISTS guild_prompts (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 guild_id TEXT NOT NULL,
@@ -184,308 +459,279 @@ export class Database {
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP
             )
         `);
+
+        await this.migrate();
+    }
+
+    private async migrate(): Promise<void> {
+        const row = await this.get<{ user_version: number }>('PRAGMA user_version');
+        let current = row?.user_version ?? 0;
+        for (const migration of MIGRATIONS) {
+            if (migration.version <= current) continue;
+            await this.transaction(async () => {
+                for (const sql of migration.statements) await this.exec(sql);
+                await this.exec(`PRAGMA user_version = ${migration.version}`);
+            });
+            current = migration.version;
+            console.log(`Applied database migration ${migration.version}`);
+        }
     }
 
     async linkUser(discordId: string, iracingUsername: string, iracingCustomerId?: number): Promise<void> {
-        return new Promise((resolve, reject) => {
-            this.db.run(
-                'INSERT OR REPLACE INTO user_links (discord_id, iracing_username, iracing_customer_id) VALUES (?, ?, ?)',
-                [discordId, iracingUsername, iracingCustomerId || null],
-                (err) => {
-                    if (err) reject(err);
-                    else resolve();
-                }
-            );
-        });
+        await this.run(
+            'INSERT OR REPLACE INTO user_links (discord_id, iracing_username, iracing_customer_id) VALUES (?, ?, ?)',
+            [discordId, iracingUsername, iracingCustomerId || null]
+        );
     }
 
     async getLinkedUser(discordId: string): Promise<UserLink | null> {
-        return new Promise((resolve, reject) => {
-            this.db.get(
-                'SELECT discord_id, iracing_username, iracing_customer_id, created_at FROM user_links WHERE discord_id = ?',
-                [discordId],
-                (err, row: UserLink | undefined) => {
-                    if (err) reject(err);
-                    else resolve(row || null);
-                }
-            );
-        });
+        return this.get<UserLink>(
+            'SELECT discord_id, iracing_username, iracing_customer_id, created_at FROM user_links WHERE discord_id = ?',
+            [discordId]
+        );
     }
 
     async unlinkUser(discordId: string): Promise<boolean> {
-        return new Promise((resolve, reject) => {
-            this.db.run('DELETE FROM user_links WHERE discord_id = ?', [discordId], function(err) {
-                if (err) reject(err);
-                else resolve(this.changes > 0);
-            });
-        });
+        const { changes } = await this.run('DELETE FROM user_links WHERE discord_id = ?', [discordId]);
+        return changes > 0;
     }
 
     async getAllLinkedUsers(): Promise<UserLink[]> {
-        const all = promisify(this.db.all.bind(this.db));
-        const results = await all(
+        return this.all<UserLink>(
             'SELECT discord_id, iracing_username, iracing_customer_id, created_at FROM user_links ORDER BY created_at DESC'
-        ) as UserLink[];
-        
-        return results;
+        );
     }
 
+    // Replaces the whole official series list atomically
     async updateOfficialSeries(seriesList: OfficialSeries[]): Promise<void> {
-        return new Promise<void>((resolve, reject) => {
-            this.db.run('DELETE FROM official_series', (err) => {
-                if (err) {
-                    reject(err);
-                    return;
-                }
-                
-                let completed = 0;
-                const total = seriesList.length;
-                
-                if (total === 0) {
-                    resolve();
-                    return;
-                }
-                
-                for (const series of seriesList) {
-                    this.db.run(
-                        'INSERT INTO official_series (series_id, series_name, series_short_name, category, category_id) VALUES (?, ?, ?, ?, ?)',
-                        [series.series_id, series.series_name, series.series_short_name, series.category, series.category_id],
-                        (err) => {
-                            if (err) {
-                                reject(err);
-                                return;
-                            }
-                            completed++;
-                            if (completed === total) {
-                                resolve();
-                            }
-                        }
-                    );
-                }
-            });
+        await this.transaction(async (run) => {
+            await run('DELETE FROM official_series');
+            for (const series of seriesList) {
+                await run(
+                    'INSERT INTO official_series (series_id, series_name, series_short_name, category, category_id) VALUES (?, ?, ?, ?, ?)',
+                    [series.series_id, series.series_name, series.series_short_name, series.category, series.category_id]
+                );
+            }
         });
     }
     
     async getOfficialSeries(): Promise<OfficialSeries[]> {
-        const all = promisify(this.db.all.bind(this.db));
-        const results = await all(
+        return this.all<OfficialSeries>(
             'SELECT series_id, series_name, series_short_name, category, category_id, last_updated FROM official_series ORDER BY series_name'
-        ) as OfficialSeries[];
-        
-        return results;
+        );
     }
     
     async setChannelTrack(channelId: string, guildId: string, seriesId: number, seriesName: string): Promise<void> {
-        return new Promise((resolve, reject) => {
-            this.db.run(
-                'INSERT OR REPLACE INTO channel_tracks (channel_id, guild_id, series_id, series_name) VALUES (?, ?, ?, ?)',
-                [channelId, guildId, seriesId, seriesName],
-                (err) => {
-                    if (err) reject(err);
-                    else resolve();
-                }
-            );
-        });
+        await this.run(
+            'INSERT OR REPLACE INTO channel_tracks (channel_id, guild_id, series_id, series_name) VALUES (?, ?, ?, ?)',
+            [channelId, guildId, seriesId, seriesName]
+        );
     }
     
     async getChannelTrack(channelId: string): Promise<ChannelTrack | null> {
-        return new Promise((resolve, reject) => {
-            this.db.get(
-                'SELECT channel_id, guild_id, series_id, series_name, created_at FROM channel_tracks WHERE channel_id = ?',
-                [channelId],
-                (err, row: ChannelTrack | undefined) => {
-                    if (err) reject(err);
-                    else resolve(row || null);
-                }
-            );
-        });
+        return this.get<ChannelTrack>(
+            'SELECT channel_id, guild_id, series_id, series_name, created_at FROM channel_tracks WHERE channel_id = ?',
+            [channelId]
+        );
     }
     
     async removeChannelTrack(channelId: string): Promise<boolean> {
-        return new Promise((resolve, reject) => {
-            this.db.run('DELETE FROM channel_tracks WHERE channel_id = ?', [channelId], function(err) {
-                if (err) reject(err);
-                else resolve(this.changes > 0);
-            });
-        });
+        const { changes } = await this.run('DELETE FROM channel_tracks WHERE channel_id = ?', [channelId]);
+        return changes > 0;
     }
     
     async getGuildLinkedUsers(guildId: string): Promise<UserLink[]> {
-        const all = promisify(this.db.all.bind(this.db));
-        const results = await all(
+        return this.all<UserLink>(
             'SELECT DISTINCT ul.discord_id, ul.iracing_username, ul.iracing_customer_id, ul.created_at FROM user_links ul WHERE ul.discord_id IN (SELECT DISTINCT discord_id FROM user_links)'
-        ) as UserLink[];
-        
-        return results;
+        );
     }
     
     async getAllChannelTracks(): Promise<ChannelTrack[]> {
-        const all = promisify(this.db.all.bind(this.db));
-        const results = await all(
+        return this.all<ChannelTrack>(
             'SELECT channel_id, guild_id, series_id, series_name, created_at FROM channel_tracks'
-        ) as ChannelTrack[];
-        
-        return results;
+        );
     }
     
     async upsertTrackCarCombo(combo: TrackCarCombo): Promise<number> {
-        return new Promise((resolve, reject) => {
-            this.db.run(
-                'INSERT OR REPLACE INTO track_car_combos (series_id, track_id, car_id, track_name, config_name, car_name) VALUES (?, ?, ?, ?, ?, ?)',
-                [combo.series_id, combo.track_id, combo.car_id, combo.track_name, combo.config_name, combo.car_name],
-                function(err) {
-                    if (err) reject(err);
-                    else resolve(this.lastID);
-                }
-            );
-        });
+        const { lastID } = await this.run(
+            'INSERT OR REPLACE INTO track_car_combos (series_id, track_id, car_id, track_name, config_name, car_name) VALUES (?, ?, ?, ?, ?, ?)',
+            [combo.series_id, combo.track_id, combo.car_id, combo.track_name, combo.config_name, combo.car_name]
+        );
+        return lastID;
     }
     
     async getTrackCarCombosBySeriesId(seriesId: number): Promise<TrackCarCombo[]> {
-        return new Promise((resolve, reject) => {
-            this.db.all(
-                'SELECT id, series_id, track_id, car_id, track_name, config_name, car_name, last_updated FROM track_car_combos WHERE series_id = ? ORDER BY track_name ASC, car_name ASC',
-                [seriesId],
-                (err, rows: TrackCarCombo[]) => {
-                    if (err) reject(err);
-                    else resolve(rows || []);
-                }
-            );
-        });
+        return this.all<TrackCarCombo>(
+            'SELECT id, series_id, track_id, car_id, track_name, config_name, car_name, last_updated FROM track_car_combos WHERE series_id = ? ORDER BY track_name ASC, car_name ASC',
+            [seriesId]
+        );
     }
     
     // Race Log Channel methods
     async setRaceLogChannel(channelId: string, guildId: string): Promise<void> {
-        return new Promise((resolve, reject) => {
-            this.db.run(
-                'INSERT OR REPLACE INTO race_log_channels (channel_id, guild_id) VALUES (?, ?)',
-                [channelId, guildId],
-                (err) => {
-                    if (err) reject(err);
-                    else resolve();
-                }
-            );
-        });
+        await this.run(
+            'INSERT OR REPLACE INTO race_log_channels (channel_id, guild_id) VALUES (?, ?)',
+            [channelId, guildId]
+        );
     }
 
     async getRaceLogChannel(channelId: string): Promise<RaceLogChannel | null> {
-        return new Promise((resolve, reject) => {
-            this.db.get(
-                'SELECT channel_id, guild_id, created_at FROM race_log_channels WHERE channel_id = ?',
-                [channelId],
-                (err, row: RaceLogChannel | undefined) => {
-                    if (err) reject(err);
-                    else resolve(row || null);
-                }
-            );
-        });
+        return this.get<RaceLogChannel>(
+            'SELECT channel_id, guild_id, created_at FROM race_log_channels WHERE channel_id = ?',
+            [channelId]
+        );
     }
 
     async getAllRaceLogChannels(): Promise<RaceLogChannel[]> {
-        const all = promisify(this.db.all.bind(this.db));
-        const results = await all(
+        return this.all<RaceLogChannel>(
             'SELECT channel_id, guild_id, created_at FROM race_log_channels ORDER BY created_at DESC'
-        ) as RaceLogChannel[];
-        
-        return results;
+        );
     }
 
     // Guild prompt methods
     async addGuildPrompt(guildId: string, content: string): Promise<void> {
-        return new Promise((resolve, reject) => {
-            this.db.run(
-                'INSERT INTO guild_prompts (guild_id, content) VALUES (?, ?)',
-                [guildId, content],
-                (err) => {
-                    if (err) reject(err);
-                    else resolve();
-                }
-            );
-        });
+        await this.run('INSERT INTO guild_prompts (guild_id, content) VALUES (?, ?)', [guildId, content]);
     }
 
     async getGuildPrompts(guildId: string): Promise<string[]> {
-        return new Promise((resolve, reject) => {
-            this.db.all(
-                'SELECT content FROM guild_prompts WHERE guild_id = ? ORDER BY created_at ASC, id ASC',
-                [guildId],
-                (err, rows: Array<{ content: string }>) => {
-                    if (err) reject(err);
-                    else resolve((rows || []).map(r => r.content));
-                }
-            );
-        });
+        const rows = await this.all<{ content: string }>(
+            'SELECT content FROM guild_prompts WHERE guild_id = ? ORDER BY created_at ASC, id ASC',
+            [guildId]
+        );
+        return rows.map(r => r.content);
     }
 
     async clearGuildPrompts(guildId: string): Promise<number> {
-        return new Promise((resolve, reject) => {
-            this.db.run('DELETE FROM guild_prompts WHERE guild_id = ?', [guildId], function(err) {
-                if (err) reject(err);
-                else resolve(this.changes || 0);
-            });
-        });
+        const { changes } = await this.run('DELETE FROM guild_prompts WHERE guild_id = ?', [guildId]);
+        return changes || 0;
     }
 
     async removeRaceLogChannel(channelId: string): Promise<boolean> {
-        return new Promise((resolve, reject) => {
-            this.db.run('DELETE FROM race_log_channels WHERE channel_id = ?', [channelId], function(err) {
-                if (err) reject(err);
-                else resolve(this.changes > 0);
-            });
+        const { changes } = await this.run('DELETE FROM race_log_channels WHERE channel_id = ?', [channelId]);
+        return changes > 0;
+    }
+
+    // Race log message ledger methods
+    async getRaceLogMessages(channelId: string): Promise<RaceLogMessage[]> {
+        return this.all<RaceLogMessage>(
+            'SELECT subsession_id, discord_id, channel_id, message_id, render_hash, posted_at FROM race_log_messages WHERE channel_id = ?',
+            [channelId]
+        );
+    }
+
+    async upsertRaceLogMessage(entry: RaceLogMessage): Promise<void> {
+        await this.run(
+            `INSERT INTO race_log_messages (subsession_id, discord_id, channel_id, message_id, render_hash) VALUES (?, ?, ?, ?, ?)
+             ON CONFLICT (subsession_id, discord_id, channel_id) DO UPDATE SET
+                message_id = excluded.message_id,
+                render_hash = excluded.render_hash,
+                posted_at = CURRENT_TIMESTAMP`,
+            [entry.subsession_id, entry.discord_id, entry.channel_id, entry.message_id, entry.render_hash]
+        );
+    }
+
+    async deleteRaceLogMessage(channelId: string, messageId: string): Promise<void> {
+        await this.run('DELETE FROM race_log_messages WHERE channel_id = ? AND message_id = ?', [channelId, messageId]);
+    }
+
+    // AI summary methods
+    async getAiSummary(subsessionId: number, discordId: string, promptHash: string): Promise<string | null> {
+        const row = await this.get<{ summary: string }>(
+            'SELECT summary FROM ai_summaries WHERE subsession_id = ? AND discord_id = ? AND prompt_hash = ?',
+            [subsessionId, discordId, promptHash]
+        );
+        return row ? row.summary : null;
+    }
+
+    async saveAiSummary(entry: AiSummary): Promise<void> {
+        await this.run(
+            `INSERT INTO ai_summaries (subsession_id, discord_id, prompt_hash, model, summary) VALUES (?, ?, ?, ?, ?)
+             ON CONFLICT (subsession_id, discord_id, prompt_hash) DO UPDATE SET
+                model = excluded.model,
+                summary = excluded.summary,
+                created_at = CURRENT_TIMESTAMP`,
+            [entry.subsession_id, entry.discord_id, entry.prompt_hash, entry.model, entry.summary]
+        );
+    }
+
+    // World record methods
+    async getWorldRecords(keys: WorldRecordKey[]): Promise<WorldRecordRow[]> {
+        const out: WorldRecordRow[] = [];
+        const seen = new Set<string>();
+        const unique = keys.filter(k => {
+            const id = `${k.car_id}:${k.track_id}:${k.season_year}:${k.season_quarter}`;
+            if (seen.has(id)) return false;
+            seen.add(id);
+            return true;
+        });
+        const tuples = new Array(MAX_WORLD_RECORD_KEYS).fill('(?, ?, ?, ?)').join(', ');
+        for (let i = 0; i < unique.length; i += MAX_WORLD_RECORD_KEYS) {
+            const chunk = unique.slice(i, i + MAX_WORLD_RECORD_KEYS);
+            const params: any[] = [];
+            for (const k of chunk) params.push(k.car_id, k.track_id, k.season_year, k.season_quarter);
+            // Pad to a fixed width so every chunk shares one cached statement
+            while (params.length < MAX_IN_PARAMS) params.push(null);
+            const rows = await this.all<WorldRecordRow>(
+                `SELECT car_id, track_id, season_year, season_quarter, session_type, lap_time, fetched_at, expires_at
+                 FROM world_records WHERE (car_id, track_id, season_year, season_quarter) IN (VALUES ${tuples})`,
+                params
+            );
+            out.push(...rows);
+        }
+        return out;
+    }
+
+    async saveWorldRecords(rows: WorldRecordRow[]): Promise<void> {
+        if (rows.length === 0) return;
+        await this.transaction(async (run) => {
+            for (const r of rows) {
+                await run(
+                    `INSERT INTO world_records (car_id, track_id, season_year, season_quarter, session_type, lap_time, fetched_at, expires_at)
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                     ON CONFLICT (car_id, track_id, season_year, season_quarter, session_type) DO UPDATE SET
+                        lap_time = excluded.lap_time,
+                        fetched_at = excluded.fetched_at,
+                        expires_at = excluded.expires_at`,
+                    [r.car_id, r.track_id, r.season_year, r.season_quarter, r.session_type, r.lap_time, r.fetched_at, r.expires_at]
+                );
+            }
         });
     }
 
     // Race Result methods
+    private raceResultParams(result: RaceResult): any[] {
+        const startTs = Date.parse(result.start_time);
+        return [
+            result.subsession_id, result.discord_id, result.iracing_customer_id, result.iracing_username,
+            result.series_id, result.series_name, result.track_id, result.track_name, result.config_name,
+            result.car_id, result.car_name, result.start_time, Number.isFinite(startTs) ? startTs : null,
+            result.finish_position, result.starting_position,
+            result.incidents, result.irating_before, result.irating_after, result.license_level_before,
+            result.license_level_after, result.event_type, result.official_session ? 1 : 0
+        ];
+    }
+
     async upsertRaceResult(result: RaceResult): Promise<void> {
-        return new Promise((resolve, reject) => {
-            this.db.run(
-                `INSERT OR REPLACE INTO race_results (
-                    subsession_id, discord_id, iracing_customer_id, iracing_username,
-                    series_id, series_name, track_id, track_name, config_name,
-                    car_id, car_name, start_time, finish_position, starting_position,
-                    incidents, irating_before, irating_after, license_level_before,
-                    license_level_after, event_type, official_session
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)`,
-                [
-                    result.subsession_id, result.discord_id, result.iracing_customer_id, result.iracing_username,
-                    result.series_id, result.series_name, result.track_id, result.track_name, result.config_name,
-                    result.car_id, result.car_name, result.start_time, result.finish_position, result.starting_position,
-                    result.incidents, result.irating_before, result.irating_after, result.license_level_before,
-                    result.license_level_after, result.event_type, result.official_session ? 1 : 0
-                ],
-                (err) => {
-                    if (err) reject(err);
-                    else resolve();
-                }
-            );
+        await this.run(RACE_RESULT_UPSERT, this.raceResultParams(result));
+    }
+
+    // Writes many results in a single transaction
+    async upsertRaceResults(results: RaceResult[]): Promise<void> {
+        if (results.length === 0) return;
+        await this.transaction(async (run) => {
+            for (const r of results) await run(RACE_RESULT_UPSERT, this.raceResultParams(r));
         });
     }
 
     async getRecentRaceResults(discordId: string, limit: number = 10): Promise<RaceResult[]> {
-        return new Promise((resolve, reject) => {
-            this.db.all(
-                `SELECT * FROM race_results WHERE discord_id = ? 
-                 ORDER BY start_time DESC LIMIT ?`,
-                [discordId, limit],
-                (err, rows: RaceResult[]) => {
-                    if (err) reject(err);
-                    else resolve(rows || []);
-                }
-            );
-        });
+        return this.all<RaceResult>(
+            'SELECT * FROM race_results WHERE discord_id = ? ORDER BY start_ts DESC, id DESC LIMIT ?',
+            [discordId, limit]
+        );
     }
 
     async getAllRaceResultsAsc(): Promise<RaceResult[]> {
-        return new Promise((resolve, reject) => {
-            this.db.all(
-                `SELECT * FROM race_results ORDER BY datetime(start_time) ASC, id ASC`,
-                [],
-                (err, rows: RaceResult[]) => {
-                    if (err) reject(err);
-                    else resolve(rows || []);
-                }
-            );
-        });
+        return this.all<RaceResult>('SELECT * FROM race_results ORDER BY start_ts ASC, id ASC');
     }
 
     async getRaceResultsForUserAsc(discordId: string, opts?: { trackId?: number; carId?: number }): Promise<RaceResult[]> {
@@ -493,43 +739,96 @@ export class Database {
         const where: string[] = ['discord_id = ?'];
         if (opts?.trackId) { where.push('track_id = ?'); params.push(opts.trackId); }
         if (opts?.carId) { where.push('car_id = ?'); params.push(opts.carId); }
-        const sql = `SELECT * FROM race_results WHERE ${where.join(' AND ')} ORDER BY datetime(start_time) ASC, id ASC`;
-        return new Promise((resolve, reject) => {
-            this.db.all(sql, params, (err, rows: RaceResult[]) => {
-                if (err) reject(err);
-                else resolve(rows || []);
-            });
-        });
+        return this.all<RaceResult>(
+            `SELECT * FROM race_results WHERE ${where.join(' AND ')} ORDER BY start_ts ASC, id ASC`,
+            params
+        );
     }
 
     async getRaceResultExists(subsessionId: number, discordId: string): Promise<boolean> {
-        return new Promise((resolve, reject) => {
-            this.db.get(
-                'SELECT 1 FROM race_results WHERE subsession_id = ? AND discord_id = ?',
-                [subsessionId, discordId],
-                (err, row) => {
-                    if (err) reject(err);
-                    else resolve(!!row);
-                }
+        const row = await this.get('SELECT 1 FROM race_results WHERE subsession_id = ? AND discord_id = ? LIMIT 1', [subsessionId, discordId]);
+        return !!row;
+    }
+
+    // Set-based existence check: which of these subsessions are already stored for the user
+    async getExistingSubsessionIds(discordId: string, subsessionIds: number[]): Promise<Set<number>> {
+        const existing = new Set<number>();
+        const ids = Array.from(new Set(subsessionIds));
+        for (let i = 0; i < ids.length; i += MAX_IN_PARAMS) {
+            const chunk = ids.slice(i, i + MAX_IN_PARAMS);
+            // Pad to a fixed width so every chunk shares one cached statement
+            const params = chunk.concat(new Array(MAX_IN_PARAMS - chunk.length).fill(null));
+            const rows = await this.all<{ subsession_id: number }>(
+                `SELECT subsession_id FROM race_results WHERE discord_id = ? AND subsession_id IN (${new Array(MAX_IN_PARAMS).fill('?').join(', ')})`,
+                [discordId, ...params]
             );
+            for (const row of rows) existing.add(row.subsession_id);
+        }
+        return existing;
+    }
+
+    // Pace methods
+    async getPaceHistory(discordId: string, sinceTs: number | null): Promise<PacePoint[]> {
+        return this.all<PacePoint>(
+            `SELECT start_ts, pct_over_wr, car_id, track_id FROM race_results
+             WHERE discord_id = ? AND start_ts >= ?
+             ORDER BY start_ts ASC`,
+            [discordId, sinceTs ?? 0]
+        );
+    }
+
+    // Results without a pace that are not waiting out a retry backoff
+    async getResultsMissingPace(discordId: string, now: number = Date.now()): Promise<RaceResult[]> {
+        return this.all<RaceResult>(
+            `SELECT * FROM race_results
+             WHERE discord_id = ? AND pace_updated_at IS NULL AND (pace_retry_at IS NULL OR pace_retry_at <= ?)
+             ORDER BY start_ts ASC, id ASC`,
+            [discordId, now]
+        );
+    }
+
+    async setRaceResultPace(paces: RacePace[]): Promise<void> {
+        if (paces.length === 0) return;
+        const now = Date.now();
+        await this.transaction(async (run) => {
+            for (const p of paces) {
+                await run(
+                    `UPDATE race_results SET best_lap_time = ?, wr_lap_time = ?, pct_over_wr = ?, pace_updated_at = ?
+                     WHERE subsession_id = ? AND discord_id = ?`,
+                    [p.best_lap_time, p.wr_lap_time, p.pct_over_wr, now, p.subsession_id, p.discord_id]
+                );
+            }
         });
     }
 
-    async getLatestRaceResultTime(discordId: string): Promise<string | null> {
-        return new Promise((resolve, reject) => {
-            this.db.get(
-                'SELECT start_time FROM race_results WHERE discord_id = ? ORDER BY start_time DESC LIMIT 1',
-                [discordId],
-                (err, row: { start_time: string } | undefined) => {
-                    if (err) reject(err);
-                    else resolve(row?.start_time || null);
-                }
-            );
+    async deferRaceResultPace(deferrals: PaceDeferral[]): Promise<void> {
+        if (deferrals.length === 0) return;
+        const now = Date.now();
+        await this.transaction(async (run) => {
+            for (const d of deferrals) {
+                await run(
+                    `UPDATE race_results SET pace_attempts = ?, pace_retry_at = ?, pace_updated_at = ?
+                     WHERE subsession_id = ? AND discord_id = ?`,
+                    [d.attempts, d.retry_at, d.retry_at === null ? now : null, d.subsession_id, d.discord_id]
+                );
+            }
         });
     }
 
+    async getLatestRaceResultTime(discordId: string): Promise<string | null> {
+        const row = await this.get<{ start_time: string }>(
+            'SELECT start_time FROM race_results WHERE discord_id = ? ORDER BY start_ts DESC LIMIT 1',
+            [discordId]
+        );
+        return row?.start_time || null;
+    }
+
     close(): void {
         if (this.db) {
+            for (const stmt of this.statements.values()) {
+                try { stmt.finalize(); } catch {}
+            }
+            this.statements.clear();
             try {
                 this.db.close();
             } catch (error) {
@@ -1,8 +1,17 @@
-import axios, { AxiosInstance } from 'axios';
+import axios, { AxiosInstance, AxiosRequestConfig, AxiosResponse } from 'axios';
 import { createHash } from 'crypto';
+import { Agent as HttpAgent } from 'http';
+import { Agent as HttpsAgent } from 'https';
 import sharp from 'sharp';
 import { promises as fs } from 'fs';
 import { join } from 'path';
+import { SubsessionStore } from './subsession-store';
+import { mapWithConcurrency } from './concurrency';
+import { RateLimiter, RateLimitState } from './rate-limiter';
+import { AssetCatalog } from './asset-catalog';
+import { streamJsonArray } from './json-stream';
+import { metrics } from './metrics';
+import { WorldRecordKey, WorldRecordRow } from './database';
 
 export interface MemberSummary {
     cust_id: number;
@@ -139,6 +148,14 @@ interface WorldRecordsMeta {
     last_updated?: string;
 }
 
+export interface SeriesSearchOptions {
+    customerId?: number;
+    startRangeBegin?: string;
+    finishRangeBegin?: string;
+    seriesId?: number;
+    officialOnly?: boolean;
+}
+
 export interface WorldRecordOptions {
     seasonYear?: number;
     seasonQuarter?: number;
@@ -148,6 +165,82 @@ export interface WorldRecordOptions {
     includePractice?: boolean;  // default false
 }
 
+// Fastest world record lap per session type for one car/track/season (1/10000 s)
+export interface WorldRecordBests {
+    practice?: number;
+    qualify?: number;
+    tt?: number;
+    race?: number;
+}
+
+// WR lap for one car/track; complete is false when some chunks failed (or the lookup failed
+// outright), so the lap may be slower than the real record
+export interface WorldRecordLookup {
+    lapTime: number | undefined;
+    complete: boolean;
+}
+
+// Persistent backing for world records (implemented by Database)
+export interface WorldRecordStore {
+    getWorldRecords(keys: WorldRecordKey[]): Promise<WorldRecordRow[]>;
+    saveWorldRecords(rows: WorldRecordRow[]): Promise<void>;
+}
+
+const WORLD_RECORD_FIELDS = {
+    practice: 'practice_lap_time',
+    qualify: 'qualify_lap_time',
+    tt: 'tt_lap_time',
+    race: 'race_lap_time'
+} as const;
+
+type WorldRecordSessionType = keyof typeof WORLD_RECORD_FIELDS;
+
+// Past seasons are final; the current season and all-time records (season 0) can still be beaten
+export function worldRecordTtlMs(seasonYear: number, seasonQuarter: number, now: number = Date.now()): number {
+    const hour = 60 * 60 * 1000;
+    if (!seasonYear) return 6 * hour;
+    const date = new Date(now);
+    const year = date.getUTCFullYear();
+    const quarter = Math.floor(date.getUTCMonth() / 3) + 1;
+    const past = seasonYear < year || (seasonYear === year && seasonQuarter > 0 && seasonQuarter < quarter);
+    return past ? 90 * 24 * hour : hour;
+}
+
+function pickWorldRecord(bests: WorldRecordBests | undefined, opts?: WorldRecordOptions): number | undefined {
+    if (!bests) return undefined;
+    const candidates = [
+        opts?.includePractice ? bests.practice : undefined,  // default false
+        opts?.includeQualify !== false ? bests.qualify : undefined,
+        opts?.includeTimeTrial !== false ? bests.tt : undefined,
+        opts?.includeRace !== false ? bests.race : undefined
+    ];
+    let best: number | undefined;
+    for (const val of candidates) {
+        if (typeof val === 'number' && val > 0 && (best === undefined || val < best)) best = val;
+    }
+    return best;
+}
+
+// Keep-alive sockets shared by members-ng, S3 links and chunk downloads
+const httpAgent = new HttpAgent({ keepAlive: true, maxSockets: 32 });
+const httpsAgent = new HttpsAgent({ keepAlive: true, maxSockets: 32 });
+
+const MAX_RETRIES = 3;
+
+// Full-jitter exponential backoff; Retry-After (seconds) wins when the server sends one
+function retryDelayMs(attempt: number, retryAfterHeader?: any): number {
+    const retryAfterSec = parseInt(String(retryAfterHeader ?? ''), 10);
+    if (Number.isFinite(retryAfterSec) && retryAfterSec > 0) return retryAfterSec * 1000;
+    return Math.random() * Math.min(8000, 500 * 2 ** attempt);
+}
+
+function isRetryable(error: any): boolean {
+    const status = error?.response?.status;
+    if (typeof status === 'number') return status === 429 || status >= 500;
+    // Network failures (reset sockets, timeouts, DNS hiccups) have no response
+    return !!error?.isAxiosError && error?.code !== 'ERR_CANCELED';
+}
+
 export class iRacingClient {
     private username: string;
     private password: string;
@@ -155,9 +248,17 @@ export class iRacingClient {
     private authCookie: string | null = null;
     private loginPromise: Promise<void> | null = null;
     private staticImagesBase = 'https://images-static.iracing.com/';
-    private worldRecordCache = new Map<string, { value: number | undefined; expiresAt: number }>();
-    private subsessionCache = new Map<number, { data: any; expiresAt: number }>();
+    private worldRecordCache = new Map<string, { bests: WorldRecordBests; complete: boolean; expiresAt: number }>();
+    private worldRecordInFlight = new Map<string, Promise<{ bests: WorldRecordBests; complete: boolean }>>();
+    private worldRecordStore: WorldRecordStore | null = null;
+    private subsessionStore = new SubsessionStore();
+    private subsessionInFlight = new Map<number, Promise<any | null>>();
+    private rateLimiter = new RateLimiter();
+    private readonly baseURL: string;
     private readonly cacheDir = './data/cache/images';
+    private assetCatalog = new AssetCatalog((path) => this.fetchMaybeS3(path));
+    private trackMapPngs = new Map<string, Promise<string | null>>();
+    private getInFlight = new Map<string, Promise<any>>();
 
     constructor() {
         this.username = process.env.IRACING_USERNAME || '';
@@ -173,14 +274,47 @@ export class iRacingClient {
             throw new Error('iRacing credentials not configured');
         }
 
+        // IRACING_BASE_URL lets the bot run against a local fake members-ng server
+        this.baseURL = (process.env.IRACING_BASE_URL?.trim() || 'https://members-ng.iracing.com').replace(/\/$/, '');
         this.client = axios.create({
-            baseURL: 'https://members-ng.iracing.com',
+            baseURL: this.baseURL,
             timeout: 30000,
+            httpAgent,
+            httpsAgent,
             headers: {
                 'User-Agent': 'iRacing Discord Bot',
                 'Content-Type': 'application/json'
             }
         });
+
+        // Rate limiting applies to members-ng only; S3 links and chunk files are absolute URLs elsewhere
+        this.client.interceptors.request.use(async (config) => {
+            if (this.isMembersRequest(config.url)) await this.rateLimiter.waitForCapacity();
+            return config;
+        });
+        this.client.interceptors.response.use(
+            (response) => {
+                if (this.isMembersRequest(response.config?.url)) this.rateLimiter.update(response.headers as any);
+                return response;
+            },
+            (error) => {
+                const response = error?.response;
+                if (response && this.isMembersRequest(response.config?.url)) {
+                    this.rateLimiter.update(response.headers);
+                    if (response.status === 429) this.rateLimiter.throttled(response.headers?.['retry-after']);
+                }
+                return Promise.reject(error);
+            }
+        );
+    }
+
+    private isMembersRequest(url?: string): boolean {
+        if (!url) return false;
+        return !/^https?:\/\//i.test(url) || url.startsWith(this.baseURL);
+    }
+
+    getRateLimitState(): RateLimitState {
+        return this.rateLimiter.getState();
     }
 
     private async login(): Promise<void> {
@@ -239,11 +373,12 @@ export class iRacingClient {
     }
 
     private async ensureAuthenticated(forceReauth: boolean = false): Promise<void> {
-        if (!this.authCookie || forceReauth) {
+        if (forceReauth) {
             this.authCookie = null;
             this.loginPromise = null;
-            await this.login();
         }
+        // Callers arriving while a login is in flight join it instead of starting another
+        if (!this.authCookie) await this.login();
     }
 
     // Expose the authenticated Axios client for callers that need raw access
@@ -252,17 +387,113 @@ export class iRacingClient {
         return this.client;
     }
 
-    async searchMember(username: string): Promise<number | null> {
-        try {
-            await this.ensureAuthenticated();
-            
-            const response = await this.client.get('/data/lookup/drivers', {
-                params: {
-                    search_term: username
+    // Every GET goes through here: one re-login on 401 (shared by concurrent requests that saw the
+    // same expired cookie) and jittered retries on 429, 5xx and network errors.
+    private async getWithRetry<T = any>(url: string, config?: AxiosRequestConfig): Promise<AxiosResponse<T>> {
+        const members = this.isMembersRequest(url);
+        // Members-ng paths are few and fixed; S3 and chunk URLs are unique, so they share one label
+        const endpoint = members ? url.split('?')[0]! : 's3';
+        let reauthed = false;
+        for (let attempt = 0; ; attempt++) {
+            if (members) await this.ensureAuthenticated();
+            const cookie = this.authCookie;
+            const endTimer = metrics.startTimer('iracing_request_duration_seconds', { endpoint });
+            try {
+                const response = await this.client.get<T>(url, config);
+                endTimer({ status: response.status });
+                const bytes = parseInt(String(response.headers?.['content-length'] ?? ''), 10);
+                if (Number.isFinite(bytes)) metrics.inc('iracing_response_bytes_total', { endpoint }, bytes);
+                return response;
+            } catch (error: any) {
+                const status = error?.response?.status;
+                endTimer({ status: status ?? 'error' });
+                if (members && status === 401 && !reauthed) {
+                    reauthed = true;
+                    // Another request may already have logged in again
+                    if (this.authCookie === cookie) {
+                        console.log('Authentication expired, retrying with fresh login...');
+                        metrics.inc('iracing_reauth_total');
+                        await this.ensureAuthenticated(true);
+                    }
+                    continue;
                 }
-            });
+                if (attempt >= MAX_RETRIES || !isRetryable(error)) throw error;
+                metrics.inc('iracing_request_retries_total', { endpoint, reason: status ?? 'network' });
+                await new Promise(resolve => setTimeout(resolve, retryDelayMs(attempt, error?.response?.headers?.['retry-after'])));
+            }
+        }
+    }
 
-            const results = response.data as DriverSearchResult[];
+    // GET a members-ng endpoint and follow its S3 `link` when present. Identical GETs already in
+    // flight share one request, so callers must treat the returned data as read-only.
+    async fetchMaybeS3<T = any>(path: string, params?: any): Promise<T> {
+        const key = `${path}?${JSON.stringify(params ?? {})}`;
+        let pending = this.getInFlight.get(key);
+        if (!pending) {
+            pending = (async () => {
+                const response = await this.getWithRetry(path, { params });
+                if (response.data && response.data.link) {
+                    const s3 = await this.getWithRetry(response.data.link);
+                    return s3.data;
+                }
+                return response.data;
+            })().finally(() => this.getInFlight.delete(key));
+            this.getInFlight.set(key, pending);
+        } else {
+            metrics.inc('iracing_shared_requests_total', { endpoint: path });
+        }
+        return pending;
+    }
+
+    private chunkUrls(chunkInfo: any): string[] {
+        if (!chunkInfo?.base_download_url || !Array.isArray(chunkInfo.chunk_file_names)) return [];
+        const base = String(chunkInfo.base_download_url).replace(/\/?$/, '/');
+        return chunkInfo.chunk_file_names.map((name: string) => base + name);
+    }
+
+    // Rows of a `chunk_info` result set in chunk order. Up to `prefetch` chunk files download ahead
+    // of the consumer, so memory is bounded by the window rather than the size of the result.
+    async *iterateChunkRows<T = any>(chunkInfo: any, opts?: { prefetch?: number; onChunkError?: (url: string, error: unknown) => void }): AsyncGenerator<T> {
+        const urls = this.chunkUrls(chunkInfo);
+        const prefetch = Math.max(1, opts?.prefetch ?? 4);
+        const load = (url: string): Promise<T[]> => (async () => {
+            const rows: T[] = [];
+            const response = await this.getWithRetry(url, { responseType: 'stream' });
+            for await (const row of streamJsonArray<T>(response.data)) rows.push(row);
+            return rows;
+        })().catch((error) => {
+            if (opts?.onChunkError) opts.onChunkError(url, error);
+            else console.error('Error fetching chunk:', error);
+            return [];
+        });
+        const window: Array<Promise<T[]>> = [];
+        let next = 0;
+        while (window.length < prefetch && next < urls.length) window.push(load(urls[next++]!));
+        while (window.length > 0) {
+            const rows = await window.shift()!;
+            if (next < urls.length) window.push(load(urls[next++]!));
+            for (const row of rows) yield row;
+        }
+    }
+
+    // Unordered variant for reductions: chunks stream in parallel and each row is handed to `visit`
+    // as it is parsed, without buffering. Resolves to false if any chunk failed.
+    async forEachChunkRow<T = any>(chunkInfo: any, visit: (row: T) => void, opts?: { concurrency?: number }): Promise<boolean> {
+        let complete = true;
+        await mapWithConcurrency(this.chunkUrls(chunkInfo), opts?.concurrency ?? 4, async (url) => {
+            try {
+                const response = await this.getWithRetry(url, { responseType: 'stream' });
+                for await (const row of streamJsonArray<T>(response.data)) visit(row);
+            } catch (error) {
+                complete = false;
+            }
+        });
+        return complete;
+    }
+
+    async searchMember(username: string): Promise<number | null> {
+        try {
+            const results = await this.fetchMaybeS3<DriverSearchResult[]>('/data/lookup/drivers', { search_term: username });
             
             if (results && results.length > 0) {
                 // Try to find exact match first
@@ -276,31 +507,7 @@ export class iRacingClient {
             }
             
             return null;
-        } catch (error: any) {
-            if (error.response?.status === 401) {
-                console.log('Authentication expired, retrying with fresh login...');
-                try {
-                    await this.ensureAuthenticated(true);
-                    const response = await this.client.get('/data/lookup/drivers', {
-                        params: {
-                            search_term: username
-                        }
-                    });
-                    const results = response.data as DriverSearchResult[];
-                    if (results && results.length > 0) {
-                        for (const member of results) {
-                            if (member.display_name.toLowerCase() === username.toLowerCase()) {
-                                return member.cust_id;
-                            }
-                        }
-                        return results[0]?.cust_id || null;
-                    }
-                    return null;
-                } catch (retryError) {
-                    console.error(`Error searching for member ${username} after retry:`, retryError);
-                    return null;
-                }
-            }
+        } catch (error) {
             console.error(`Error searching for member ${username}:`, error);
             return null;
         }
@@ -308,30 +515,10 @@ export class iRacingClient {
 
     async getMemberSummary(customerId: number): Promise<MemberSummary | null> {
         try {
-            await this.ensureAuthenticated();
+            const memberResponse = await this.fetchMaybeS3<MemberResponse>('/data/member/get', { cust_ids: customerId });
             
-            const response = await this.client.get('/data/member/get', {
-                params: {
-                    cust_ids: customerId
-                }
-            });
-
-            // Check if response contains a link to S3 data
-            if (response.data.link) {
-                console.log('Fetching data from S3 link:', response.data.link);
-                const s3Response = await this.client.get(response.data.link);
-                const memberResponse = s3Response.data as MemberResponse;
-                
-                if (memberResponse.success && memberResponse.members && memberResponse.members.length > 0) {
-                    return memberResponse.members[0] || null;
-                }
-            } else {
-                // Direct response format
-                const memberResponse = response.data as MemberResponse;
-                
-                if (memberResponse.success && memberResponse.members && memberResponse.members.length > 0) {
-                    return memberResponse.members[0] || null;
-                }
+            if (memberResponse && memberResponse.success && memberResponse.members && memberResponse.members.length > 0) {
+                return memberResponse.members[0] || null;
             }
             
             return null;
@@ -342,163 +529,105 @@ export class iRacingClient {
     }
 
     async getMemberRecentRaces(customerId: number): Promise<RecentRace[] | null> {
-        const fetchOnce = async (): Promise<RecentRace[] | null> => {
-            const response = await this.client.get('/data/stats/member_recent_races', {
-                params: { cust_id: customerId }
-            });
-
-            let data = response.data;
-
-            // Check if response contains a link to S3 data
-            if (data && (data as any).link) {
-                console.log('Fetching recent races from S3 link');
-                const s3Response = await this.client.get((data as any).link);
-                data = s3Response.data;
-            }
+        try {
+            const data: any = await this.fetchMaybeS3('/data/stats/member_recent_races', { cust_id: customerId });
 
             // Handle the actual data structure - races are in a 'races' property
-            if (data && Array.isArray((data as any).races)) {
-                return (data as any).races as RecentRace[];
+            if (data && Array.isArray(data.races)) {
+                return data.races as RecentRace[];
             } else if (Array.isArray(data)) {
                 return data as RecentRace[];
             }
 
             console.warn('Unexpected recent races data format:', typeof data);
             return null;
-        };
-
-        try {
-            await this.ensureAuthenticated();
-            return await fetchOnce();
-        } catch (error: any) {
-            if (error?.response?.status === 401) {
-                console.log('Authentication expired for recent races, retrying with fresh login...');
-                try {
-                    await this.ensureAuthenticated(true);
-                    return await fetchOnce();
-                } catch (retryError) {
-                    console.error(`Error fetching recent races for ${customerId} after retry:`, retryError);
-                    return null;
-                }
-            }
+        } catch (error) {
             console.error(`Error fetching recent races for ${customerId}:`, error);
             return null;
         }
     }
 
-    async searchSeriesResults(options: {
-        customerId?: number;
-        startRangeBegin?: string;
-        finishRangeBegin?: string;
-        seriesId?: number;
-        officialOnly?: boolean;
-    }): Promise<any[] | null> {
+    // Kept for existing callers of the client; the bot itself does not search series. Buffers every row,
+    // so wide searches should use iterateSeriesResults instead.
+    async searchSeriesResults(options: SeriesSearchOptions): Promise<any[] | null> {
         try {
-            await this.ensureAuthenticated();
-            
-            const params: any = {};
-            if (options.customerId) params.cust_id = options.customerId;
-            if (options.startRangeBegin) params.start_range_begin = options.startRangeBegin;
-            if (options.finishRangeBegin) params.finish_range_begin = options.finishRangeBegin;
-            if (options.seriesId) params.series_id = options.seriesId;
-            if (options.officialOnly !== undefined) params.official_only = options.officialOnly;
-            
-            const response = await this.client.get('/data/results/search_series', { params });
-
-            let data = response.data;
-            
-            // Check if response contains a link to S3 data
-            if (data.link) {
-                console.log('Fetching search results from S3 link');
-                const s3Response = await this.client.get(data.link);
-                data = s3Response.data;
-            }
-            
-            // Handle chunk_info structure for series search results
-            if (data.data && data.data.chunk_info) {
-                const chunkInfo = data.data.chunk_info;
-                if (chunkInfo.chunk_file_names && chunkInfo.base_download_url) {
-                    console.log(`Processing ${chunkInfo.num_chunks} chunks with ${chunkInfo.rows} total results`);
-                    
-                    const allResults: any[] = [];
-                    const baseUrl = chunkInfo.base_download_url.replace(/\/$/, '');
-                    
-                    for (const chunkFile of chunkInfo.chunk_file_names) {
-                        try {
-                            const chunkUrl = `${baseUrl}/${chunkFile}`;
-                            const chunkResponse = await this.client.get(chunkUrl);
-                            if (Array.isArray(chunkResponse.data)) {
-                                allResults.push(...chunkResponse.data);
-                            }
-                        } catch (chunkError) {
-                            console.error('Error fetching chunk:', chunkError);
-                        }
-                    }
-                    
-                    return allResults;
-                }
-            }
-            
-            // Direct array response
-            if (Array.isArray(data)) {
-                return data;
-            }
-            
-            console.warn('Unexpected series search data format:', typeof data);
-            return null;
-        } catch (error: any) {
-            if (error.response?.status === 401) {
-                console.log('Authentication expired for series search, retrying with fresh login...');
-                try {
-                    await this.ensureAuthenticated(true);
-                    // Retry the same logic
-                    return await this.searchSeriesResults(options);
-                } catch (retryError) {
-                    console.error('Error searching series results after retry:', retryError);
-                    return null;
-                }
-            }
+            const all: any[] = [];
+            for await (const row of this.iterateSeriesResults(options)) all.push(row);
+            return all;
+        } catch (error) {
             console.error('Error searching series results:', error);
             return null;
         }
     }
 
-    async getSubsessionResult(subsessionId: number, opts?: { forceRefresh?: boolean; ttlMs?: number }): Promise<any | null> {
-        const ttl = typeof opts?.ttlMs === 'number' ? opts!.ttlMs! : 24 * 60 * 60 * 1000; // default 24h
-        const cached = this.subsessionCache.get(subsessionId);
-        const now = Date.now();
-        if (!opts?.forceRefresh && cached && cached.expiresAt > now) {
-            return cached.data;
+    // Streams series search rows chunk by chunk; prefer this over searchSeriesResults for wide searches
+    async *iterateSeriesResults(options: SeriesSearchOptions): AsyncGenerator<any> {
+        const params: any = {};
+        if (options.customerId) params.cust_id = options.customerId;
+        if (options.startRangeBegin) params.start_range_begin = options.startRangeBegin;
+        if (options.finishRangeBegin) params.finish_range_begin = options.finishRangeBegin;
+        if (options.seriesId) params.series_id = options.seriesId;
+        if (options.officialOnly !== undefined) params.official_only = options.officialOnly;
+
+        const data: any = await this.fetchMaybeS3('/data/results/search_series', params);
+
+        // Handle chunk_info structure for series search results
+        const chunkInfo = data?.data?.chunk_info;
+        if (chunkInfo && chunkInfo.chunk_file_names && chunkInfo.base_download_url) {
+            console.log(`Processing ${chunkInfo.num_chunks} chunks with ${chunkInfo.rows} total results`);
+            yield* this.iterateChunkRows(chunkInfo);
+            return;
         }
-        try {
-            await this.ensureAuthenticated();
 
-            const response = await this.client.get('/data/results/get', {
-                params: {
-                    subsession_id: subsessionId,
-                    include_licenses: true
-                }
-            });
+        // Direct array response
+        if (Array.isArray(data)) {
+            yield* data;
+            return;
+        }
 
-            let data = response.data;
-            if (data && data.link) {
-                console.log('Fetching subsession result from S3 link');
-                const s3Response = await this.client.get(data.link);
-                data = s3Response.data;
-            }
+        console.warn('Unexpected series search data format:', typeof data);
+    }
 
-            this.subsessionCache.set(subsessionId, { data, expiresAt: now + ttl });
-            return data;
-        } catch (error: any) {
-            if (error?.response?.status === 401) {
-                try {
-                    await this.ensureAuthenticated(true);
-                    return await this.getSubsessionResult(subsessionId, opts);
-                } catch (retryErr) {
-                    console.error(`Error fetching subsession result for ${subsessionId} after retry:`, retryErr);
-                    return null;
-                }
-            }
+    // Results are served from the persistent subsession store; only misses hit the API.
+    async getSubsessionResult(subsessionId: number, opts?: { forceRefresh?: boolean }): Promise<any | null> {
+        if (!opts?.forceRefresh) {
+            const stored = await this.subsessionStore.get(subsessionId);
+            metrics.inc('cache_lookups_total', { cache: 'subsession', result: stored ? 'hit' : 'miss' });
+            if (stored) return stored;
+        }
+        return this.fetchSubsessionShared(subsessionId);
+    }
+
+    // Bulk lookup: store hits are returned directly, misses are fetched a few at a time.
+    async getSubsessionResults(subsessionIds: number[], opts?: { concurrency?: number }): Promise<Map<number, any>> {
+        const results = await this.subsessionStore.getMany(subsessionIds);
+        const missing = Array.from(new Set(subsessionIds)).filter(id => !results.has(id));
+        metrics.inc('cache_lookups_total', { cache: 'subsession', result: 'hit' }, results.size);
+        metrics.inc('cache_lookups_total', { cache: 'subsession', result: 'miss' }, missing.length);
+        // Misses go straight to the fetch; the store was already checked above
+        await mapWithConcurrency(missing, opts?.concurrency ?? 4, async (id) => {
+            const data = await this.fetchSubsessionShared(id);
+            if (data) results.set(id, data);
+        });
+        return results;
+    }
+
+    // Concurrent fetches of the same subsession share one request
+    private fetchSubsessionShared(subsessionId: number): Promise<any | null> {
+        const pending = this.subsessionInFlight.get(subsessionId);
+        if (pending) return pending;
+        const request = this.fetchSubsessionResult(subsessionId).finally(() => {
+            this.subsessionInFlight.delete(subsessionId);
+        });
+        this.subsessionInFlight.set(subsessionId, request);
+        return request;
+    }
+
+    private async fetchSubsessionResult(subsessionId: number): Promise<any | null> {
+        try {
+            const data = await this.fetchMaybeS3('/data/results/get', { subsession_id: subsessionId, include_licenses: true });
+            return await this.subsessionStore.put(subsessionId, data);
+        } catch (error) {
             console.error(`Error fetching subsession result for ${subsessionId}:`, error);
             return null;
         }
@@ -506,19 +635,7 @@ export class iRacingClient {
 
     async getSeries(): Promise<Series[] | null> {
         try {
-            await this.ensureAuthenticated();
-            
-            const response = await this.client.get('/data/series/get');
-
-            // Check if response contains a link to S3 data
-            if (response.data.link) {
-                console.log('Fetching series data from S3 link');
-                const s3Response = await this.client.get(response.data.link);
-                return s3Response.data as Series[];
-            } else {
-                // Direct response format
-                return response.data as Series[];
-            }
+            return await this.fetchMaybeS3<Series[]>('/data/series/get');
         } catch (error) {
             console.error('Error fetching series data:', error);
             return null;
@@ -540,41 +657,10 @@ export class iRacingClient {
 
     async getMemberBestLapTimes(customerId: number, carId?: number): Promise<MemberBests | null> {
         try {
-            await this.ensureAuthenticated();
-            
             const params: any = { cust_id: customerId };
             if (carId) params.car_id = carId;
-            
-            const response = await this.client.get('/data/stats/member_bests', { params });
-
-            // Check if response contains a link to S3 data
-            if (response.data.link) {
-                console.log('Fetching member bests from S3 link');
-                const s3Response = await this.client.get(response.data.link);
-                return s3Response.data as MemberBests;
-            } else {
-                // Direct response format
-                return response.data as MemberBests;
-            }
-        } catch (error: any) {
-            if (error.response?.status === 401) {
-                console.log('Authentication expired for lap times, retrying with fresh login...');
-                try {
-                    await this.ensureAuthenticated(true);
-                    const params: any = { cust_id: customerId };
-                    if (carId) params.car_id = carId;
-                    const response = await this.client.get('/data/stats/member_bests', { params });
-                    if (response.data.link) {
-                        const s3Response = await this.client.get(response.data.link);
-                        return s3Response.data as MemberBests;
-                    } else {
-                        return response.data as MemberBests;
-                    }
-                } catch (retryError) {
-                    console.error(`Error fetching member best lap times for ${customerId} after retry:`, retryError);
-                    return null;
-                }
-            }
+            return await this.fetchMaybeS3<MemberBests>('/data/stats/member_bests', params);
+        } catch (error) {
             console.error(`Error fetching member best lap times for ${customerId}:`, error);
             return null;
         }
@@ -597,77 +683,134 @@ export class iRacingClient {
 
     // Fetch the world record best lap for a car+track.
     // Returns the best time in ten-thousandths of a second, or undefined if none.
+    setWorldRecordStore(store: WorldRecordStore | null): void {
+        this.worldRecordStore = store;
+    }
+
     async getWorldRecordBestLap(carId: number, trackId: number, opts?: WorldRecordOptions): Promise<number | undefined> {
-        await this.ensureAuthenticated();
-        const includeQualify = opts?.includeQualify !== false; // default true
-        const includeRace = opts?.includeRace !== false;       // default true
-        const includeTT = opts?.includeTimeTrial !== false;     // default true
-        const includePractice = !!opts?.includePractice;        // default false
+        const records = await this.getWorldRecords([{ carId, trackId }], opts);
+        return records.get(`${carId}:${trackId}`)?.lapTime;
+    }
+
+    // Best WR lap for many car/track pairs, keyed `${carId}:${trackId}`. Served from memory, then the
+    // store, and only then fetched (bounded concurrency; concurrent callers share one fetch per key).
+    async getWorldRecords(pairs: Array<{ carId: number; trackId: number }>, opts?: WorldRecordOptions & { concurrency?: number }): Promise<Map<string, WorldRecordLookup>> {
+        const seasonYear = opts?.seasonYear ?? 0;
+        const seasonQuarter = opts?.seasonQuarter ?? 0;
+        const seasonKey = (p: { carId: number; trackId: number }) => `${p.carId}:${p.trackId}:${seasonYear}:${seasonQuarter}`;
+        const unique = new Map<string, { carId: number; trackId: number }>();
+        for (const p of pairs) unique.set(`${p.carId}:${p.trackId}`, p);
 
-        const key = `wr:${carId}:${trackId}:${opts?.seasonYear ?? 'all'}:${opts?.seasonQuarter ?? 'all'}:${includeQualify?1:0}${includeRace?1:0}${includeTT?1:0}${includePractice?1:0}`;
         const now = Date.now();
-        const cached = this.worldRecordCache.get(key);
-        if (cached && cached.expiresAt > now) {
-            return cached.value;
+        const bests = new Map<string, { bests: WorldRecordBests; complete: boolean }>();
+        let missing = Array.from(unique.values()).filter((p) => {
+            const cached = this.worldRecordCache.get(seasonKey(p));
+            if (cached && cached.expiresAt > now) {
+                bests.set(seasonKey(p), cached);
+                return false;
+            }
+            return true;
+        });
+
+        if (missing.length > 0 && this.worldRecordStore) {
+            try {
+                const rows = await this.worldRecordStore.getWorldRecords(missing.map(p => ({ car_id: p.carId, track_id: p.trackId, season_year: seasonYear, season_quarter: seasonQuarter })));
+                // Only complete downloads are ever stored
+                const stored = new Map<string, { bests: WorldRecordBests; complete: boolean; expiresAt: number }>();
+                for (const row of rows) {
+                    const key = `${row.car_id}:${row.track_id}:${row.season_year}:${row.season_quarter}`;
+                    const entry = stored.get(key) ?? { bests: {}, complete: true, expiresAt: row.expires_at };
+                    if (row.lap_time !== null && row.session_type in WORLD_RECORD_FIELDS) entry.bests[row.session_type as WorldRecordSessionType] = row.lap_time;
+                    entry.expiresAt = Math.min(entry.expiresAt, row.expires_at);
+                    stored.set(key, entry);
+                }
+                for (const [key, entry] of stored) {
+                    if (entry.expiresAt <= now) continue;
+                    this.worldRecordCache.set(key, entry);
+                    bests.set(key, entry);
+                }
+            } catch (error) {
+                console.warn('Could not read stored world records:', error);
+            }
+            missing = missing.filter(p => !bests.has(seasonKey(p)));
         }
+        metrics.inc('cache_lookups_total', { cache: 'world_record', result: 'hit' }, unique.size - missing.length);
+        metrics.inc('cache_lookups_total', { cache: 'world_record', result: 'miss' }, missing.length);
 
-        const params: any = { car_id: carId, track_id: trackId };
-        if (typeof opts?.seasonYear === 'number') params.season_year = opts.seasonYear;
-        if (typeof opts?.seasonQuarter === 'number') params.season_quarter = opts.seasonQuarter;
+        await mapWithConcurrency(missing, opts?.concurrency ?? 4, async (p) => {
+            try {
+                bests.set(seasonKey(p), await this.loadWorldRecordBests(p.carId, p.trackId, seasonYear, seasonQuarter));
+            } catch (error) {
+                console.warn(`Could not fetch world records for car ${p.carId} at track ${p.trackId}:`, error);
+            }
+        });
 
-        const resp = await this.client.get('/data/stats/world_records', { params });
-        const data = resp.data?.data as WorldRecordsMeta | undefined;
-        const meta: WorldRecordsMeta | undefined = data && (data.success !== undefined ? data : resp.data as any);
+        const out = new Map<string, WorldRecordLookup>();
+        for (const [key, p] of unique) {
+            const entry = bests.get(seasonKey(p));
+            out.set(key, { lapTime: pickWorldRecord(entry?.bests, opts), complete: entry?.complete ?? false });
+        }
+        return out;
+    }
 
-        let best: number | undefined;
-        const consider = (val?: number | null) => {
-            if (typeof val === 'number' && val > 0) {
-                if (best === undefined || val < best) best = val;
-            }
-        };
-
-        if (meta && meta.chunk_info && meta.chunk_info.base_download_url && Array.isArray(meta.chunk_info.chunk_file_names)) {
-            const base = meta.chunk_info.base_download_url.replace(/\/$/, '/')
-            for (const name of meta.chunk_info.chunk_file_names) {
-                try {
-                    const url = base + name;
-                    const chunkResp = await this.client.get(url);
-                    const rows: any[] = Array.isArray(chunkResp.data) ? chunkResp.data : [];
-                    for (const row of rows) {
-                        if (includePractice) consider(row.practice_lap_time);
-                        if (includeQualify) consider(row.qualify_lap_time);
-                        if (includeTT) consider(row.tt_lap_time);
-                        if (includeRace) consider(row.race_lap_time);
+    private loadWorldRecordBests(carId: number, trackId: number, seasonYear: number, seasonQuarter: number): Promise<{ bests: WorldRecordBests; complete: boolean }> {
+        const key = `${carId}:${trackId}:${seasonYear}:${seasonQuarter}`;
+        let pending = this.worldRecordInFlight.get(key);
+        if (!pending) {
+            pending = (async () => {
+                const { bests, complete } = await this.fetchWorldRecordBests(carId, trackId, seasonYear, seasonQuarter);
+                const now = Date.now();
+                // A partial download (failed chunk) is only kept briefly, in memory
+                const expiresAt = now + (complete ? worldRecordTtlMs(seasonYear, seasonQuarter, now) : 15 * 60 * 1000);
+                this.worldRecordCache.set(key, { bests, complete, expiresAt });
+                if (complete && this.worldRecordStore) {
+                    const rows: WorldRecordRow[] = (Object.keys(WORLD_RECORD_FIELDS) as WorldRecordSessionType[]).map(type => ({
+                        car_id: carId,
+                        track_id: trackId,
+                        season_year: seasonYear,
+                        season_quarter: seasonQuarter,
+                        session_type: type,
+                        lap_time: bests[type] ?? null,
+                        fetched_at: now,
+                        expires_at: expiresAt
+                    }));
+                    try {
+                        await this.worldRecordStore.saveWorldRecords(rows);
+                    } catch (error) {
+                        console.warn(`Could not store world records for car ${carId} at track ${trackId}:`, error);
                     }
-                } catch (e) {
-                    // Skip failed chunk
                 }
-            }
+                return { bests, complete };
+            })().finally(() => this.worldRecordInFlight.delete(key));
+            this.worldRecordInFlight.set(key, pending);
         }
+        return pending;
+    }
 
-        // Cache ~15 minutes
-        this.worldRecordCache.set(key, { value: best, expiresAt: now + 15 * 60 * 1000 });
-        return best;
+    // Downloads the WR chunk files in parallel and reduces rows to per-session minima as they stream in
+    private async fetchWorldRecordBests(carId: number, trackId: number, seasonYear: number, seasonQuarter: number): Promise<{ bests: WorldRecordBests; complete: boolean }> {
+        const params: any = { car_id: carId, track_id: trackId };
+        if (seasonYear) params.season_year = seasonYear;
+        if (seasonQuarter) params.season_quarter = seasonQuarter;
+
+        const body: any = await this.fetchMaybeS3('/data/stats/world_records', params);
+        const data = body?.data as WorldRecordsMeta | undefined;
+        const meta: WorldRecordsMeta | undefined = data && (data.success !== undefined ? data : body);
+
+        const bests: WorldRecordBests = {};
+        // A failed chunk means the result must not be persisted
+        const complete = await this.forEachChunkRow<any>(meta?.chunk_info, (row) => {
+            for (const [type, field] of Object.entries(WORLD_RECORD_FIELDS) as Array<[WorldRecordSessionType, string]>) {
+                const val = row?.[field];
+                if (typeof val === 'number' && val > 0 && (bests[type] === undefined || val < bests[type]!)) bests[type] = val;
+            }
+        });
+        return { bests, complete };
     }
-    
+
     async getSeriesSeasons(seriesId: number): Promise<any> {
         try {
-            await this.ensureAuthenticated();
-            
-            const response = await this.client.get('/data/series/seasons', {
-                params: {
-                    series_id: seriesId,
-                    include_series: true
-                }
-            });
-            
-            if (response.data.link) {
-                console.log('Fetching series seasons from S3 link');
-                const s3Response = await this.client.get(response.data.link);
-                return s3Response.data;
-            } else {
-                return response.data;
-            }
+            return await this.fetchMaybeS3('/data/series/seasons', { series_id: seriesId, include_series: true });
         } catch (error) {
             console.error(`Error fetching series seasons for ${seriesId}:`, error);
             return null;
@@ -676,19 +819,7 @@ export class iRacingClient {
     
     private async getSeriesSeasonsFor(year: number, quarter: number): Promise<any> {
         try {
-            await this.ensureAuthenticated();
-            const response = await this.client.get('/data/series/seasons', {
-                params: {
-                    include_series: true,
-                    season_year: year,
-                    season_quarter: quarter
-                }
-            });
-            if (response.data.link) {
-                const s3Response = await this.client.get(response.data.link);
-                return s3Response.data;
-            }
-            return response.data;
+            return await this.fetchMaybeS3('/data/series/seasons', { include_series: true, season_year: year, season_quarter: quarter });
         } catch (error) {
             console.error(`Error fetching series seasons for ${year} Q${quarter}:`, error);
             return null;
@@ -697,16 +828,7 @@ export class iRacingClient {
     
     async getSeriesSeasonSchedule(seasonId: number): Promise<any> {
         try {
-            await this.ensureAuthenticated();
-            const response = await this.client.get('/data/series/season_schedule', {
-                params: { season_id: seasonId }
-            });
-            if (response.data.link) {
-                console.log('Fetching series season schedule from S3 link');
-                const s3Response = await this.client.get(response.data.link);
-                return s3Response.data;
-            }
-            return response.data;
+            return await this.fetchMaybeS3('/data/series/season_schedule', { season_id: seasonId });
         } catch (error) {
             console.error(`Error fetching season schedule for season ${seasonId}:`, error);
             return null;
@@ -716,70 +838,48 @@ export class iRacingClient {
     async getCurrentSeriesSchedule(seriesId: number): Promise<any> {
         // Maintained for backwards compatibility; prefer using getSeriesSeasonSchedule via getCurrentOrNextEventForSeries
         try {
-            await this.ensureAuthenticated();
-            const response = await this.client.get('/data/season/race_guide', {
-                params: { include_end_after_from: true }
-            });
-            if (response.data.link) {
-                console.log('Fetching series schedule from S3 link');
-                const s3Response = await this.client.get(response.data.link);
-                return s3Response.data;
-            }
-            return response.data;
+            return await this.fetchMaybeS3('/data/season/race_guide', { include_end_after_from: true });
         } catch (error) {
             console.error(`Error fetching race guide:`, error);
             return null;
         }
     }
 
-    // Assets helpers
-    private async fetchMaybeS3<T = any>(path: string, params?: any): Promise<T> {
-        await this.ensureAuthenticated();
-        const response = await this.client.get(path, { params });
-        if (response.data && response.data.link) {
-            const s3 = await this.client.get(response.data.link);
-            return s3.data as T;
-        }
-        return response.data as T;
+    // Catalogs are served from the AssetCatalog (id-keyed, persisted, refreshed daily)
+    async getCarAssets(): Promise<Map<number, any>> {
+        return this.assetCatalog.getCatalog('carAssets');
+    }
+
+    async getCars(): Promise<Map<number, any>> {
+        return this.assetCatalog.getCatalog('cars');
+    }
+
+    async getTrackAssets(): Promise<Map<number, any>> {
+        // If /data/track/assets is not available in some environments, callers should handle errors.
+        return this.assetCatalog.getCatalog('trackAssets');
     }
 
-    async getCarAssets(): Promise<any> {
-        return this.fetchMaybeS3('/data/car/assets');
+    startAssetRefresh(): void {
+        this.assetCatalog.startRefreshTimer();
     }
 
-    async getCars(): Promise<any> {
-        return this.fetchMaybeS3('/data/car/get');
+    stopAssetRefresh(): void {
+        this.assetCatalog.stopRefreshTimer();
     }
 
     async getCarName(carId: number): Promise<string | null> {
         try {
-            const cars = await this.getCars();
-            if (Array.isArray(cars)) {
-                const car = cars.find((c: any) => c && c.car_id === carId);
-                return car?.car_name || null;
-            }
-            return null;
+            const car = await this.assetCatalog.getCar(carId);
+            return car?.car_name || null;
         } catch (error) {
             console.warn(`Could not fetch car name for car ID ${carId}:`, error);
             return null;
         }
     }
 
-    async getTrackAssets(): Promise<any> {
-        // If /data/track/assets is not available in some environments, callers should handle errors.
-        return this.fetchMaybeS3('/data/track/assets');
-    }
-
     async getCarImageUrl(carId: number): Promise<string | null> {
         try {
-            const assets = await this.getCarAssets();
-            // assets might be an array or object keyed by car_id
-            let entry: any = null;
-            if (Array.isArray(assets)) {
-                entry = assets.find((a: any) => a && (a.car_id === carId || a.id === carId));
-            } else if (assets && typeof assets === 'object') {
-                entry = assets[carId] || Object.values(assets).find((a: any) => a && (a.car_id === carId || a.id === carId));
-            }
+            const entry = await this.assetCatalog.getCarAsset(carId);
             if (!entry) return null;
             // Prefer small/large image with folder
             const folder = entry.folder as string | undefined;
@@ -801,13 +901,7 @@ export class iRacingClient {
 
     async getTrackImageUrl(trackId: number): Promise<string | null> {
         try {
-            const assets = await this.getTrackAssets();
-            let entry: any = null;
-            if (Array.isArray(assets)) {
-                entry = assets.find((a: any) => a && (a.track_id === trackId || a.id === trackId));
-            } else if (assets && typeof assets === 'object') {
-                entry = assets[trackId] || Object.values(assets).find((a: any) => a && (a.track_id === trackId || a.id === trackId));
-            }
+            const entry = await this.assetCatalog.getTrackAsset(trackId);
             if (!entry) return null;
             // Prefer large or small image with folder
             const folder = entry.folder as string | undefined;
@@ -829,13 +923,7 @@ export class iRacingClient {
 
     async getTrackMapActiveUrl(trackId: number): Promise<string | null> {
         try {
-            const assets = await this.getTrackAssets();
-            let entry: any = null;
-            if (Array.isArray(assets)) {
-                entry = assets.find((a: any) => a && (a.track_id === trackId || a.id === trackId));
-            } else if (assets && typeof assets === 'object') {
-                entry = assets[trackId] || Object.values(assets).find((a: any) => a && (a.track_id === trackId || a.id === trackId));
-            }
+            const entry = await this.assetCatalog.getTrackAsset(trackId);
             if (!entry) return null;
             const trackMap: string | undefined = entry.track_map;
             const layers: any = entry.track_map_layers;
@@ -849,12 +937,24 @@ export class iRacingClient {
         }
     }
 
+    // Local PNG rendering of a track's active map layer. Paths are memoized per SVG URL, so the
+    // disk is checked (and the SVG converted) at most once per process; failures are retried.
     async getTrackMapActivePng(trackId: number): Promise<string | null> {
-        try {
-            // Get the SVG URL first
-            const svgUrl = await this.getTrackMapActiveUrl(trackId);
-            if (!svgUrl) return null;
+        const svgUrl = await this.getTrackMapActiveUrl(trackId);
+        if (!svgUrl) return null;
+        let pending = this.trackMapPngs.get(svgUrl);
+        if (!pending) {
+            pending = this.renderTrackMapPng(svgUrl).then((path) => {
+                if (!path) this.trackMapPngs.delete(svgUrl);
+                return path;
+            });
+            this.trackMapPngs.set(svgUrl, pending);
+        }
+        return pending;
+    }
 
+    private async renderTrackMapPng(svgUrl: string): Promise<string | null> {
+        try {
             // Create cache filename based on SVG URL hash
             const hash = createHash('sha256').update(svgUrl).digest('hex');
             const cacheFilename = `${hash}.png`;
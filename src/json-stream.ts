@@ -0,0 +1,60 @@
+import { StringDecoder } from 'string_decoder';
+
+// Yields the elements of a top-level JSON array as they arrive, so large chunk files can be
+// reduced row by row instead of being buffered and parsed whole. Only the element currently
+// being read is held in memory. Non-array bodies yield nothing.
+export async function* streamJsonArray<T = any>(source: AsyncIterable<Buffer | string>): AsyncGenerator<T> {
+    const decoder = new StringDecoder('utf8');
+    let depth = 0;
+    let inString = false;
+    let escaped = false;
+    let started = false;
+    let item = '';
+
+    for await (const piece of source) {
+        const text = typeof piece === 'string' ? piece : decoder.write(piece);
+        let itemStart = depth > 1 || (depth === 1 && item.length > 0) ? 0 : -1;
+        for (let i = 0; i < text.length; i++) {
+            const ch = text[i];
+            if (inString) {
+                if (escaped) escaped = false;
+                else if (ch === '\\') escaped = true;
+                else if (ch === '"') inString = false;
+                continue;
+            }
+            if (!started) {
+                if (ch === '[') {
+                    started = true;
+                    depth = 1;
+                } else if (ch !== ' ' && ch !== '\n' && ch !== '\r' && ch !== '\t' && ch !== '\uFEFF') {
+                    return;
+                }
+                continue;
+            }
+            if (depth === 0) return;
+            if (ch === '"') {
+                inString = true;
+                if (itemStart < 0) itemStart = i;
+            } else if (ch === '{' || ch === '[') {
+                if (itemStart < 0) itemStart = i;
+                depth++;
+            } else if (ch === '}' || ch === ']') {
+                depth--;
+                if (depth === 0) {
+                    // End of the top-level array: flush a trailing scalar element, if any
+                    const rest = (item + (itemStart >= 0 ? text.slice(itemStart, i) : '')).trim();
+                    if (rest) yield JSON.parse(rest) as T;
+                    return;
+                }
+            } else if (ch === ',' && depth === 1) {
+                const raw = (item + (itemStart >= 0 ? text.slice(itemStart, i) : '')).trim();
+                item = '';
+                itemStart = -1;
+                if (raw) yield JSON.parse(raw) as T;
+            } else if (itemStart < 0 && depth === 1 && ch !== ' ' && ch !== '\n' && ch !== '\r' && ch !== '\t') {
+                itemStart = i;
+            }
+        }
+        if (itemStart >= 0) item += text.slice(itemStart);
+    }
+}
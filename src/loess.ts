@@ -0,0 +1,147 @@
+export interface LoessOptions {
+    span?: number;
+    resolution?: number;
+    robust?: boolean;
+}
+
+// Median via quickselect (average O(n)); reorders a copy, not the input
+function median(values: number[]): number {
+    const n = values.length;
+    if (n === 0) return 0;
+    const a = values.slice();
+    const select = (k: number): number => {
+        let lo = 0, hi = n - 1;
+        while (lo < hi) {
+            const pivot = a[(lo + hi) >> 1]!;
+            let i = lo, j = hi;
+            while (i <= j) {
+                while (a[i]! < pivot) i++;
+                while (a[j]! > pivot) j--;
+                if (i <= j) {
+                    const tmp = a[i]!;
+                    a[i] = a[j]!;
+                    a[j] = tmp;
+                    i++;
+                    j--;
+                }
+            }
+            if (k <= j) hi = j;
+            else if (k >= i) lo = i;
+            else break;
+        }
+        return a[k]!;
+    };
+    if (n % 2 === 1) return select((n - 1) >> 1);
+    return (select(n / 2 - 1) + select(n / 2)) / 2;
+}
+
+// Robust LOESS (local linear, tricube weights, bisquare robustness) evaluated at a fixed number of
+// anchors. The k nearest neighbours of a sorted x are a contiguous window that only slides right
+// as x increases, so no per-anchor sort is needed; residuals at the data points are interpolated
+// from the anchor fits. For a fixed resolution the cost is linear in the number of points.
+export function loessSmooth(points: Array<{ t: number; y: number }>, opts?: LoessOptions): Array<{ t: number; y: number }> {
+    let pts = points;
+    for (let i = 1; i < pts.length; i++) {
+        if (pts[i]!.t < pts[i - 1]!.t) {
+            pts = points.slice().sort((a, b) => a.t - b.t);
+            break;
+        }
+    }
+    const n = pts.length;
+    if (n === 0) return [];
+    if (n === 1) return [pts[0]!];
+    // Adaptive span: for small datasets, increase span for a looser, smoother fit
+    const autoSpan = n <= 20 ? 0.85 : n <= 50 ? 0.65 : 0.45;
+    const span = Math.min(0.95, Math.max(0.2, opts?.span ?? autoSpan));
+    const k = Math.min(n, Math.max(2, Math.ceil(span * n)));
+    const xs = pts.map(p => p.t);
+    const ys = pts.map(p => p.y);
+    const minX = xs[0]!;
+    const maxX = xs[n - 1]!;
+    // Higher resolution for smoother visual line regardless of point count
+    const resolution = Math.max(100, Math.min(360, opts?.resolution ?? 240));
+    const evalXs: number[] = [];
+    if (resolution >= n) {
+        for (const x of xs) evalXs.push(x);
+    } else {
+        const step = (maxX - minX) / (resolution - 1 || 1);
+        for (let i = 0; i < resolution; i++) evalXs.push(minX + i * step);
+    }
+
+    // Local weighted linear fit at each (ascending) anchor. x is centred on the anchor so the
+    // intercept is the fitted value and epoch-ms magnitudes don't swamp the sums.
+    const fitAnchors = (robustW?: number[]): number[] => {
+        const fits: number[] = new Array(evalXs.length);
+        let lo = 0;
+        for (let e = 0; e < evalXs.length; e++) {
+            const x0 = evalXs[e]!;
+            while (lo + k < n && xs[lo + k]! - x0 < x0 - xs[lo]!) lo++;
+            const hi = lo + k - 1;
+            const dmax = Math.max(x0 - xs[lo]!, xs[hi]! - x0) || 1e-9;
+            let Sw = 0, Sx = 0, Sy = 0, Sxx = 0, Sxy = 0;
+            for (let idx = lo; idx <= hi; idx++) {
+                const dx = xs[idx]! - x0;
+                const u = Math.abs(dx) / dmax;
+                const c = 1 - u * u * u;
+                let w = c * c * c; // tricube weight
+                if (robustW) w *= robustW[idx]!;
+                const y = ys[idx]!;
+                Sw += w;
+                Sx += w * dx;
+                Sy += w * y;
+                Sxx += w * dx * dx;
+                Sxy += w * dx * y;
+            }
+            const denom = Sw * Sxx - Sx * Sx;
+            fits[e] = (Math.abs(denom) < 1e-12 || Sw === 0) ? Sy / (Sw || 1) : (Sxx * Sy - Sx * Sxy) / denom;
+        }
+        return fits;
+    };
+
+    // Fitted values at the data points, linearly interpolated between anchors
+    const fitsAtData = (anchorFits: number[]): number[] => {
+        if (evalXs.length === n) return anchorFits;
+        const out: number[] = new Array(n);
+        let a = 0;
+        for (let i = 0; i < n; i++) {
+            const x = xs[i]!;
+            while (a < evalXs.length - 2 && evalXs[a + 1]! < x) a++;
+            const xa = evalXs[a]!, xb = evalXs[a + 1]!;
+            const fa = anchorFits[a]!, fb = anchorFits[a + 1]!;
+            out[i] = xb === xa ? fa : fa + (fb - fa) * Math.min(1, Math.max(0, (x - xa) / (xb - xa)));
+        }
+        return out;
+    };
+
+    const computeRobustWeights = (fits: number[]): number[] => {
+        const residuals = ys.map((y, i) => y - fits[i]!);
+        const med = median(residuals.map(r => Math.abs(r)));
+        const s = med > 0 ? 4.685 * med : 1e-6; // stronger downweight
+        return residuals.map(r => {
+            const u = Math.abs(r) / s;
+            if (u >= 1) return 0;
+            return (1 - u * u) ** 2; // Tukey bisquare
+        });
+    };
+
+    let anchorFits = fitAnchors();
+    // Up to two robust iterations to downweight outliers strongly
+    if (opts?.robust !== false) {
+        let robustW = computeRobustWeights(fitsAtData(anchorFits));
+        robustW = computeRobustWeights(fitsAtData(fitAnchors(robustW)));
+        anchorFits = fitAnchors(robustW);
+    }
+
+    // Light moving-average on outputs to ensure smoothness
+    const win = Math.max(3, Math.floor(Math.min(13, Math.round(resolution / 30)))); // small window
+    const half = Math.floor(win / 2);
+    const smoothed: Array<{ t: number; y: number }> = [];
+    for (let i = 0; i < evalXs.length; i++) {
+        let sum = 0, cnt = 0;
+        for (let j = i - half; j <= i + half; j++) {
+            if (j >= 0 && j < evalXs.length) { sum += anchorFits[j]!; cnt++; }
+        }
+        smoothed.push({ t: evalXs[i]!, y: cnt > 0 ? sum / cnt : anchorFits[i]! });
+    }
+    return smoothed;
+}
@@ -0,0 +1,194 @@
+import { createServer, Server } from 'http';
+
+export type MetricLabels = Record<string, string | number>;
+
+// Latency buckets in seconds, from a fast cache read up to a slow AI completion
+const DEFAULT_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30];
+
+interface CounterSeries {
+    labels: MetricLabels;
+    value: number;
+}
+
+interface HistogramSeries {
+    labels: MetricLabels;
+    counts: number[];
+    sum: number;
+    count: number;
+}
+
+export interface HistogramSummary {
+    count: number;
+    sum: number;
+    mean: number;
+    p50: number;
+    p95: number;
+}
+
+function labelKey(labels?: MetricLabels): string {
+    if (!labels) return '';
+    return Object.keys(labels).sort().map(k => `${k}="${String(labels[k]).replace(/\\/g, '\\\\').replace(/"/g, '\\"').replace(/\n/g, '\\n')}"`).join(',');
+}
+
+function matches(labels: MetricLabels, match: MetricLabels): boolean {
+    return Object.entries(match).every(([k, v]) => String(labels[k]) === String(v));
+}
+
+// Minimal in-process registry of counters and histograms, rendered in the Prometheus text format
+export class Metrics {
+    private help = new Map<string, string>();
+    private counters = new Map<string, Map<string, CounterSeries>>();
+    private histograms = new Map<string, Map<string, HistogramSeries>>();
+    private readonly buckets: number[];
+
+    constructor(buckets: number[] = DEFAULT_BUCKETS) {
+        this.buckets = buckets;
+    }
+
+    describe(name: string, help: string): void {
+        this.help.set(name, help);
+    }
+
+    inc(name: string, labels?: MetricLabels, value: number = 1): void {
+        let series = this.counters.get(name);
+        if (!series) {
+            series = new Map();
+            this.counters.set(name, series);
+        }
+        const key = labelKey(labels);
+        const c = series.get(key);
+        if (c) c.value += value;
+        else series.set(key, { labels: labels ?? {}, value });
+    }
+
+    observe(name: string, seconds: number, labels?: MetricLabels): void {
+        let series = this.histograms.get(name);
+        if (!series) {
+            series = new Map();
+            this.histograms.set(name, series);
+        }
+        const key = labelKey(labels);
+        let h = series.get(key);
+        if (!h) {
+            h = { labels: labels ?? {}, counts: new Array(this.buckets.length).fill(0), sum: 0, count: 0 };
+            series.set(key, h);
+        }
+        for (let i = 0; i < this.buckets.length; i++) {
+            if (seconds <= this.buckets[i]!) h.counts[i] = h.counts[i]! + 1;
+        }
+        h.sum += seconds;
+        h.count++;
+    }
+
+    // Returns a function that records the elapsed time; labels known only at the end can be added then
+    startTimer(name: string, labels?: MetricLabels): (extra?: MetricLabels) => number {
+        const start = process.hrtime.bigint();
+        return (extra) => {
+            const seconds = Number(process.hrtime.bigint() - start) / 1e9;
+            this.observe(name, seconds, extra ? { ...labels, ...extra } : labels);
+            return seconds;
+        };
+    }
+
+    async time<T>(name: string, labels: MetricLabels | undefined, fn: () => Promise<T>): Promise<T> {
+        const end = this.startTimer(name, labels);
+        try {
+            const value = await fn();
+            end({ outcome: 'ok' });
+            return value;
+        } catch (error) {
+            end({ outcome: 'error' });
+            throw error;
+        }
+    }
+
+    // Counter total, optionally restricted to series whose labels include `match`
+    counterValue(name: string, match?: MetricLabels): number {
+        let total = 0;
+        for (const c of this.counters.get(name)?.values() ?? []) {
+            if (!match || matches(c.labels, match)) total += c.value;
+        }
+        return total;
+    }
+
+    // Histogram series merged across labels (or those matching `match`); quantiles are bucket upper bounds
+    summary(name: string, match?: MetricLabels): HistogramSummary {
+        const counts: number[] = new Array(this.buckets.length).fill(0);
+        let sum = 0;
+        let count = 0;
+        for (const h of this.histograms.get(name)?.values() ?? []) {
+            if (match && !matches(h.labels, match)) continue;
+            h.counts.forEach((c, i) => { counts[i] = counts[i]! + c; });
+            sum += h.sum;
+            count += h.count;
+        }
+        const quantile = (q: number): number => {
+            const rank = q * count;
+            for (let i = 0; i < this.buckets.length; i++) {
+                if (counts[i]! >= rank) return this.buckets[i]!;
+            }
+            return Infinity;
+        };
+        return { count, sum, mean: count > 0 ? sum / count : 0, p50: count > 0 ? quantile(0.5) : 0, p95: count > 0 ? quantile(0.95) : 0 };
+    }
+
+    render(): string {
+        const lines: string[] = [];
+        for (const [name, series] of this.counters) {
+            if (this.help.has(name)) lines.push(`# HELP ${name} ${this.help.get(name)}`);
+            lines.push(`# TYPE ${name} counter`);
+            for (const [key, c] of series) lines.push(`${name}${key ? `{${key}}` : ''} ${c.value}`);
+        }
+        for (const [name, series] of this.histograms) {
+            if (this.help.has(name)) lines.push(`# HELP ${name} ${this.help.get(name)}`);
+            lines.push(`# TYPE ${name} histogram`);
+            for (const [key, h] of series) {
+                const sep = key ? ',' : '';
+                this.buckets.forEach((le, i) => lines.push(`${name}_bucket{${key}${sep}le="${le}"} ${h.counts[i]}`));
+                lines.push(`${name}_bucket{${key}${sep}le="+Inf"} ${h.count}`);
+                lines.push(`${name}_sum${key ? `{${key}}` : ''} ${h.sum}`);
+                lines.push(`${name}_count${key ? `{${key}}` : ''} ${h.count}`);
+            }
+        }
+        return lines.join('\n') + '\n';
+    }
+
+    reset(): void {
+        this.counters.clear();
+        this.histograms.clear();
+    }
+}
+
+export const metrics = new Metrics();
+
+metrics.describe('iracing_request_duration_seconds', 'iRacing API and S3 request latency (time to response headers), per attempt');
+metrics.describe('iracing_response_bytes_total', 'Bytes received from the iRacing API and S3, from Content-Length');
+metrics.describe('iracing_request_retries_total', 'iRacing requests retried after a 429, 5xx or network error');
+metrics.describe('iracing_reauth_total', 'Re-logins triggered by an expired iRacing session');
+metrics.describe('iracing_shared_requests_total', 'GETs that joined an identical request already in flight');
+metrics.describe('cache_lookups_total', 'Cache lookups by cache and result (hit/miss)');
+metrics.describe('poll_cycle_duration_seconds', 'Duration of a race result poll cycle');
+metrics.describe('poll_users_total', 'Users polled for new race results');
+metrics.describe('poll_new_results_total', 'New race results found by the poller');
+metrics.describe('poll_errors_total', 'Users whose poll failed');
+metrics.describe('discord_send_duration_seconds', 'Latency of race log message sends and edits');
+metrics.describe('ai_summary_duration_seconds', 'Latency of OpenRouter race summary completions');
+metrics.describe('race_log_reconcile_duration_seconds', 'Duration of the startup race log reconcile');
+metrics.describe('history_build_duration_seconds', 'Time to build a /history chart response');
+
+// Serves GET /metrics for Prometheus; anything else is a 404
+export function startMetricsServer(port: number, host: string = '127.0.0.1', registry: Metrics = metrics): Server {
+    const server = createServer((req, res) => {
+        if (req.method === 'GET' && (req.url === '/metrics' || req.url?.startsWith('/metrics?'))) {
+            res.writeHead(200, { 'Content-Type': 'text/plain; version=0.0.4; charset=utf-8' });
+            res.end(registry.render());
+        } else {
+            res.writeHead(404);
+            res.end();
+        }
+    });
+    server.on('error', (error) => console.error(`Metrics server error on ${host}:${port}:`, error));
+    server.listen(port, host, () => console.log(`Metrics available at http://${host}:${port}/metrics`));
+    server.unref();
+    return server;
+}
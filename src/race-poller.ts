@@ -0,0 +1,132 @@
+import { mapWithConcurrency } from './concurrency';
+
+export interface PollOutcome {
+    newResults: number;
+    latestActivity: number | null; // epoch ms of the most recent race seen for the user
+}
+
+export interface PollCycleStats {
+    startedAt: string;
+    durationMs: number;
+    usersTotal: number;
+    usersPolled: number;
+    usersSkipped: number;
+    newResults: number;
+    errors: number;
+}
+
+export interface RacePollerOptions<U> {
+    listUsers: () => Promise<U[]>;
+    userKey: (user: U) => string;
+    pollUser: (user: U) => Promise<PollOutcome>;
+    // Seeds the schedule for users seen for the first time (e.g. latest stored race time)
+    initialActivity?: (user: U) => Promise<number | null>;
+    concurrency?: number;
+    now?: () => number;
+}
+
+const MINUTE = 60 * 1000;
+const HOUR = 60 * MINUTE;
+const DAY = 24 * HOUR;
+
+// How long to wait before polling a user again, based on how recently they raced
+export function adaptivePollInterval(lastActivity: number | null, now: number): number {
+    if (lastActivity === null) return 6 * HOUR;
+    const idle = now - lastActivity;
+    if (idle <= 2 * DAY) return 0; // every cycle
+    if (idle <= 7 * DAY) return 15 * MINUTE;
+    if (idle <= 30 * DAY) return HOUR;
+    return 6 * HOUR;
+}
+
+// Polls linked users with bounded concurrency. Only one cycle runs at a time and
+// each user is scheduled adaptively: recently active drivers every cycle, idle
+// accounts rarely. Rate limiting is handled by the iRacing client underneath.
+export class RacePoller<U> {
+    private running: Promise<PollCycleStats> | null = null;
+    private schedule = new Map<string, { nextDueAt: number; lastActivity: number | null }>();
+    private readonly opts: RacePollerOptions<U>;
+    private readonly concurrency: number;
+    private readonly now: () => number;
+    lastStats: PollCycleStats | null = null;
+
+    constructor(opts: RacePollerOptions<U>) {
+        this.opts = opts;
+        this.concurrency = Math.max(1, opts.concurrency ?? 4);
+        this.now = opts.now ?? Date.now;
+    }
+
+    isRunning(): boolean {
+        return this.running !== null;
+    }
+
+    // Starts a cycle unless one is already in progress, in which case null is returned
+    async runCycle(opts?: { force?: boolean }): Promise<PollCycleStats | null> {
+        if (this.running) {
+            console.log('Race result poll still running; skipping this cycle');
+            return null;
+        }
+        this.running = this.cycle(!!opts?.force);
+        try {
+            return await this.running;
+        } finally {
+            this.running = null;
+        }
+    }
+
+    private async cycle(force: boolean): Promise<PollCycleStats> {
+        const started = this.now();
+        const users = await this.opts.listUsers();
+        const keys = new Set(users.map(u => this.opts.userKey(u)));
+        // Forget users who have been unlinked since the last cycle
+        for (const key of Array.from(this.schedule.keys())) {
+            if (!keys.has(key)) this.schedule.delete(key);
+        }
+
+        const due: U[] = [];
+        for (const user of users) {
+            const key = this.opts.userKey(user);
+            let entry = this.schedule.get(key);
+            if (!entry) {
+                let lastActivity: number | null = null;
+                try { lastActivity = this.opts.initialActivity ? await this.opts.initialActivity(user) : null; } catch {}
+                // New users are always polled once so their schedule reflects current activity
+                entry = { nextDueAt: started, lastActivity };
+                this.schedule.set(key, entry);
+            }
+            if (force || entry.nextDueAt <= started) due.push(user);
+        }
+
+        let newResults = 0;
+        let errors = 0;
+        await mapWithConcurrency(due, this.concurrency, async (user) => {
+            const key = this.opts.userKey(user);
+            const entry = this.schedule.get(key) ?? { nextDueAt: 0, lastActivity: null };
+            try {
+                const outcome = await this.opts.pollUser(user);
+                newResults += outcome.newResults;
+                if (outcome.latestActivity !== null && (entry.lastActivity === null || outcome.latestActivity > entry.lastActivity)) {
+                    entry.lastActivity = outcome.latestActivity;
+                }
+            } catch (error) {
+                errors++;
+                console.error(`Error polling race results for ${key}:`, error);
+            }
+            const finished = this.now();
+            entry.nextDueAt = finished + adaptivePollInterval(entry.lastActivity, finished);
+            this.schedule.set(key, entry);
+        });
+
+        const stats: PollCycleStats = {
+            startedAt: new Date(started).toISOString(),
+            durationMs: this.now() - started,
+            usersTotal: users.length,
+            usersPolled: due.length,
+            usersSkipped: users.length - due.length,
+            newResults,
+            errors
+        };
+        this.lastStats = stats;
+        return stats;
+    }
+}
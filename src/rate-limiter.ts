@@ -0,0 +1,66 @@
+export interface RateLimitState {
+    limit: number | null;
+    remaining: number | null;
+    resetAt: number | null; // epoch ms
+}
+
+// Tracks iRacing's x-ratelimit-* response headers and holds requests back
+// once the remaining budget drops to the reserve, until the window resets.
+export class RateLimiter {
+    private state: RateLimitState = { limit: null, remaining: null, resetAt: null };
+    private readonly reserve: number;
+
+    constructor(opts?: { reserve?: number }) {
+        this.reserve = opts?.reserve ?? 5;
+    }
+
+    getState(): RateLimitState {
+        return { ...this.state };
+    }
+
+    update(headers: Record<string, any> | undefined): void {
+        if (!headers) return;
+        const num = (v: any): number | null => {
+            const n = typeof v === 'number' ? v : parseInt(String(v ?? ''), 10);
+            return Number.isFinite(n) ? n : null;
+        };
+        const limit = num(headers['x-ratelimit-limit']);
+        const remaining = num(headers['x-ratelimit-remaining']);
+        const reset = num(headers['x-ratelimit-reset']);
+        if (limit !== null) this.state.limit = limit;
+        if (remaining !== null) this.state.remaining = remaining;
+        // Reset is sent as epoch seconds
+        if (reset !== null) this.state.resetAt = reset * 1000;
+    }
+
+    // Called on HTTP 429: stop issuing requests until Retry-After (or the known reset) passes
+    throttled(retryAfterHeader?: any): void {
+        const retryAfterSec = parseInt(String(retryAfterHeader ?? ''), 10);
+        const until = Number.isFinite(retryAfterSec)
+            ? Date.now() + retryAfterSec * 1000
+            : Math.max(this.state.resetAt ?? 0, Date.now() + 60 * 1000);
+        this.state.remaining = 0;
+        this.state.resetAt = until;
+    }
+
+    // Milliseconds a caller should wait before issuing another request (0 when budget remains)
+    delayMs(now: number = Date.now()): number {
+        const { remaining, resetAt } = this.state;
+        if (remaining === null || resetAt === null) return 0;
+        if (remaining > this.reserve) return 0;
+        if (resetAt <= now) {
+            this.state.remaining = null;
+            return 0;
+        }
+        return resetAt - now;
+    }
+
+    async waitForCapacity(): Promise<void> {
+        let delay = this.delayMs();
+        while (delay > 0) {
+            console.log(`iRacing rate limit nearly exhausted; backing off ${Math.ceil(delay / 1000)}s`);
+            await new Promise(resolve => setTimeout(resolve, delay + 250));
+            delay = this.delayMs();
+        }
+    }
+}
@@ -0,0 +1,150 @@
+import { promises as fs } from 'fs';
+import { join } from 'path';
+import { promisify } from 'util';
+import { gzip, gunzip } from 'zlib';
+
+const gzipAsync = promisify(gzip);
+const gunzipAsync = promisify(gunzip);
+
+// Per-driver fields we actually read from /data/results/get rows
+const RESULT_ROW_FIELDS = [
+    'cust_id',
+    'finish_position',
+    'finish_position_in_class',
+    'starting_position',
+    'laps_complete',
+    'best_lap_time',
+    'best_lap_num',
+    'average_lap',
+    'best_qual_lap_time',
+    'best_qual_lap_num',
+    'champ_points',
+    'interval'
+] as const;
+
+const SESSION_FIELDS = ['simsession_number', 'simsession_type_name', 'simsession_name', 'session_type'] as const;
+
+export interface SubsessionStoreOptions {
+    dir?: string;
+    maxMemoryBytes?: number;
+}
+
+// Finished subsessions never change once official, so we keep a trimmed copy
+// on disk (gzipped JSON, one file per subsession) with a byte-bounded LRU in front.
+export class SubsessionStore {
+    private readonly dir: string;
+    private readonly maxMemoryBytes: number;
+    private memory = new Map<number, { data: any; bytes: number }>();
+    private memoryBytes = 0;
+    private dirReady: Promise<void> | null = null;
+
+    constructor(opts?: SubsessionStoreOptions) {
+        this.dir = opts?.dir ?? './data/cache/subsessions';
+        this.maxMemoryBytes = opts?.maxMemoryBytes ?? 16 * 1024 * 1024;
+    }
+
+    // Reduce a full results payload to the fields the bot reads (SoF, laps, race/qual rows)
+    static trim(data: any): any {
+        if (!data || typeof data !== 'object') return data;
+        const sessions = Array.isArray(data.session_results) ? data.session_results : [];
+        return {
+            subsession_id: data.subsession_id,
+            event_strength_of_field: data.event_strength_of_field,
+            event_laps_complete: data.event_laps_complete,
+            session_results: sessions
+                .filter((sr: any) => /race|qual/i.test((sr?.simsession_type_name || sr?.simsession_name || sr?.session_type || '').toString()))
+                .map((sr: any) => {
+                    const session: any = {};
+                    for (const f of SESSION_FIELDS) if (sr[f] !== undefined) session[f] = sr[f];
+                    session.results = (Array.isArray(sr.results) ? sr.results : []).map((r: any) => {
+                        const row: any = {};
+                        for (const f of RESULT_ROW_FIELDS) if (r?.[f] !== undefined) row[f] = r[f];
+                        return row;
+                    });
+                    return session;
+                })
+        };
+    }
+
+    // Only complete payloads are persisted; partial/error bodies are never cached
+    static isComplete(data: any): boolean {
+        return !!data && Array.isArray(data.session_results) && data.session_results.length > 0;
+    }
+
+    async get(subsessionId: number): Promise<any | null> {
+        const hit = this.memory.get(subsessionId);
+        if (hit) {
+            // Refresh recency
+            this.memory.delete(subsessionId);
+            this.memory.set(subsessionId, hit);
+            return hit.data;
+        }
+        try {
+            const raw = await fs.readFile(this.pathFor(subsessionId));
+            const json = (await gunzipAsync(raw)).toString('utf8');
+            const data = JSON.parse(json);
+            this.remember(subsessionId, data, Buffer.byteLength(json));
+            return data;
+        } catch {
+            return null;
+        }
+    }
+
+    async getMany(subsessionIds: number[]): Promise<Map<number, any>> {
+        const out = new Map<number, any>();
+        await Promise.all(Array.from(new Set(subsessionIds)).map(async (id) => {
+            const data = await this.get(id);
+            if (data) out.set(id, data);
+        }));
+        return out;
+    }
+
+    // Trim, persist and remember a payload; returns the trimmed copy callers should use
+    async put(subsessionId: number, data: any): Promise<any> {
+        const trimmed = SubsessionStore.trim(data);
+        if (!SubsessionStore.isComplete(trimmed)) return trimmed;
+        const json = JSON.stringify(trimmed);
+        this.remember(subsessionId, trimmed, Buffer.byteLength(json));
+        try {
+            await this.ensureDir();
+            const file = this.pathFor(subsessionId);
+            const tmp = `${file}.${process.pid}.tmp`;
+            await fs.writeFile(tmp, await gzipAsync(json));
+            await fs.rename(tmp, file);
+        } catch (error) {
+            console.warn(`Could not persist subsession ${subsessionId}:`, error);
+        }
+        return trimmed;
+    }
+
+    private remember(subsessionId: number, data: any, bytes: number): void {
+        const existing = this.memory.get(subsessionId);
+        if (existing) {
+            this.memory.delete(subsessionId);
+            this.memoryBytes -= existing.bytes;
+        }
+        if (bytes > this.maxMemoryBytes) return;
+        this.memory.set(subsessionId, { data, bytes });
+        this.memoryBytes += bytes;
+        // Evict least recently used entries until back under budget
+        for (const [id, entry] of this.memory) {
+            if (this.memoryBytes <= this.maxMemoryBytes) break;
+            this.memory.delete(id);
+            this.memoryBytes -= entry.bytes;
+        }
+    }
+
+    private pathFor(subsessionId: number): string {
+        return join(this.dir, `${subsessionId}.json.gz`);
+    }
+
+    private ensureDir(): Promise<void> {
+        if (!this.dirReady) {
+            this.dirReady = fs.mkdir(this.dir, { recursive: true }).then(() => undefined, (err) => {
+                this.dirReady = null;
+                throw err;
+            });
+        }
+        return this.dirReady;
+    }
+}